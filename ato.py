@@ -2,10 +2,31 @@
 A.T.O - Jeu de type exploration avec génération procédurale de monde
 """
 
+import argparse
+import atexit
+import heapq
+import mmap
+import multiprocessing
 import os
+import random
+import struct
 import sys
 import subprocess
+import threading
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    from pygame._sdl2.video import Renderer, Texture, Window  # Backend de rendu par textures (optionnel)
+except ImportError:
+    Renderer = Texture = Window = None
+
+try:
+    import resource  # Mesure de la mémoire maximale (absent sous Windows)
+except ImportError:
+    resource = None
 
 # Installation automatique de pygame si nécessaire
 try:
@@ -41,13 +62,19 @@ except ImportError:
         print("Ou : pip install pygame")
         sys.exit(1)
 
-# Initialisation de pygame
-pygame.init()
-
-# Configuration de l'écran
-info = pygame.display.Info()
-DESKTOP_W = info.current_w  # Largeur de l'écran du bureau
-DESKTOP_H = info.current_h  # Hauteur de l'écran du bureau
+# Installation automatique de NumPy si nécessaire (mise à jour vectorisée des entités)
+try:
+    import numpy as np
+except ImportError:
+    print("NumPy n'est pas installé. Tentative d'installation...")
+    result = subprocess.run([sys.executable, "-m", "pip", "install", "numpy"], capture_output=True, text=True)
+    if result.returncode != 0:
+        print("Erreur lors de l'installation de NumPy. Installez-le manuellement : pip install numpy")
+        if result.stderr:
+            print(result.stderr[-500:])
+        sys.exit(1)
+    print("Installation réussie !")
+    import numpy as np
 
 # Constantes du jeu
 SCREEN_W = 320  # Largeur de la fenêtre de jeu
@@ -61,7 +88,15 @@ PS = 28  # Taille du joueur (Player Size)
 SPD = 8  # Vitesse de déplacement du joueur (en pixels logiques)
 BORDER_SIZE = 10  # Taille de la bordure
 MAX_CHUNKS_LOADED = 100  # Nombre maximum de chunks chargés en mémoire
+TREE_ASSET_TS = 32  # Taille d'une tuile dans les images d'arbres (un arbre de 128 px couvre 4 tuiles)
+SHADOW_STYLE = 'shadow'  # Ombres des arbres : 'shadow', 'texture', 'texture_dark' ou 'none'
 GRASS_TILE_38_FREQUENCY = 80  # Seuil (sur 100) pour afficher la tuile d'herbe 38 — soit 80% des tuiles d'herbe
+ANIM_FRAMES = 20  # Nombre d'images des animations procédurales (slime)
+SLIME_SIZE = 28  # Taille du dessin du slime (en pixels écran)
+NPC_PER_CHUNK = 12  # Nombre de slimes errants placés dans chaque nouveau chunk
+NPC_SPEED = 1.0  # Vitesse des slimes errants (pixels logiques par image)
+ENTITY_BLOCK = 2 * NPC_PER_CHUNK  # Emplacements d'entités réservés par chunk (place pour les arrivées)
+MAX_SUSPENDED_ENTITY_CHUNKS = 100  # Chunks déchargés dont les entités sont gardées ; au-delà, les plus anciens sont recyclés
 HALF_W = SCREEN_W // 2  # Moitié de la largeur (pour centrer)
 HALF_H = SCREEN_H // 2  # Moitié de la hauteur (pour centrer)
 
@@ -70,7 +105,15 @@ chunks_loaded = {}  # Dictionnaire des chunks chargés en mémoire
 chunks_order = []  # Ordre de chargement des chunks (pour LRU)
 grass_tiles = []  # Liste des images d'herbe chargées
 field_38_tile = None  # Tuile spéciale FieldsTile_38.png
-tree_tiles = []  # Liste des images d'arbres chargées
+tree_sets = {}  # Sprites d'arbres chargés par jeu d'arbres : préfixe -> [(image, ombre ou None, décalage de l'ombre), ...]
+tree_sprites_ts = 0  # DISPLAY_TS utilisée au chargement des sprites (rechargés si elle change)
+biome_corner_cache = {}  # Champs de biome aux coins des chunks : (champ, x, y) -> valeur, partagé par les chunks voisins
+chunk_biome_cache = {}  # (cx, cy) -> biome de chaque tuile du chunk
+tree_sprite_reach = 0  # Débordement maximal d'un arbre hors de sa tuile (pixels logiques)
+chunk_sprites = {}  # Hash spatial des sprites : (cx, cy) -> sprites du chunk triés par profondeur
+visible_sprites = []  # Sprites visibles à l'image précédente, triés par profondeur
+visible_entities = []  # Entités visibles : (base_y, blit), triées par profondeur
+anim_sheets = {}  # Cache des planches d'animation : nom -> (paramètres de validité, planche, largeur, hauteur)
 
 # Palette de couleurs RGB
 COLORS = {
@@ -91,6 +134,36 @@ COLORS = {
     'SLIME_L': (100, 150, 255)    # Slime clair
 }
 
+# Biomes : (nom, jeu d'arbres dans assets/Trees, densité d'arbres)
+BIOMES = [
+    ('neige', "Snow_tree", 0.10),
+    ('forêt enneigée', "Snow_christmass_tree", 0.35),
+    ('taïga', "Christmas_tree", 0.35),
+    ('lande', "Broken_tree", 0.05),
+    ('automne', "Autumn_tree", 0.30),
+    ('prairie fleurie', "Flower_tree", 0.06),
+    ('forêt', "Tree", 0.30),
+    ('forêt moussue', "Moss_tree", 0.35),
+    ('plaine', "Tree", 0.03),
+    ('verger', "Fruit_tree", 0.12),
+    ('désert', "Burned_tree", 0.03),
+    ('tropiques', "Palm_tree", 0.25),
+]
+# Biome selon la température (lignes, du froid au chaud) et l'humidité (colonnes, du sec à l'humide)
+BIOME_GRID = [
+    [0, 0, 1],
+    [3, 4, 2],
+    [5, 6, 7],
+    [8, 9, 6],
+    [10, 10, 11],
+]
+BIOME_OCTAVES = (8, 4, 2)  # Taille des cellules de chaque octave de bruit (en chunks)
+BIOME_CONTRAST = 2.0  # Étire les champs de bruit (sinon trop concentrés autour de 0.5)
+TREE_COVER_CELL = 5  # Taille des bosquets (en tuiles) : les arbres se regroupent à cette échelle
+SALT_TEMPERATURE = 1  # Décalages de hachage de chaque champ de bruit
+SALT_MOISTURE = 2
+SALT_COVER = 3
+
 # Types de tuiles
 T_GRASS = 0   # Herbe
 T_PATH = 1   # Chemin
@@ -98,18 +171,187 @@ T_TREE = 2   # Arbre
 T_HOUSE = 6  # Maison
 T_BORDER = 7 # Bordure
 
+# Entités (slimes errants) stockées champ par champ dans des tableaux NumPy : l'entité i
+# est décrite par ent_x[i], ent_y[i], etc. Pas d'objet Python par entité.
+# Chaque chunk possède un bloc contigu de ENTITY_BLOCK emplacements (ligne `bloc` des
+# tableaux vus en 2D) : les entités d'un chunk se mettent à jour par tranches entières.
+ent_x = np.zeros(0, np.float32)      # Position monde du centre (pixels logiques)
+ent_y = np.zeros(0, np.float32)
+ent_vx = np.zeros(0, np.float32)     # Vitesse (pixels logiques par image)
+ent_vy = np.zeros(0, np.float32)
+ent_frame = np.zeros(0, np.uint8)    # Image d'animation (0-19)
+ent_timer = np.zeros(0, np.int16)    # Images restantes avant de changer de direction
+ent_alive = np.zeros(0, np.bool_)    # Emplacement occupé
+entity_blocks = {}  # (cx, cy) -> numéro du bloc des entités du chunk (créé au premier chargement)
+entity_free_blocks = []  # Blocs recyclés, réutilisés avant d'agrandir les tableaux
+suspended_entity_chunks = {}  # Chunks déchargés dont les entités sont gardées, du plus ancien au plus récent
+entity_rng = np.random.default_rng(0)  # Tirage des directions des slimes
+
+# Marchabilité : un masque de bits par chunk (bit ty * CHUNK_TILES + tx à 1 = tuile bloquante)
+BLOCKING_TILES = (T_TREE, T_HOUSE)
+chunk_walls = {}  # (cx, cy) -> masque des tuiles bloquantes du chunk chargé
+path_cache = {}  # (départ, arrivée) -> chemin (liste de tuiles monde)
+path_cache_by_chunk = {}  # (cx, cy) -> clés de path_cache dont le chemin traverse le chunk
+MAX_PATH_NODES = 4000  # Nombre maximal de tuiles explorées par une recherche de chemin
+
 # États du jeu
 GAME_STATE_MENU = 0
 GAME_STATE_PLAYING = 1
 GAME_STATE_PAUSED = 2
 GAME_STATE_CONSOLE = 3
 
-# Initialisation de la fenêtre
+# Service de génération du monde (processus séparé + mémoire partagée)
+SLOT_HEADER_SIZE = 16  # En-tête d'un slot : état (1 octet), 3 octets de bourrage, cx et cy (int32)
+SLOT_FREE = 0     # Slot libre
+SLOT_PENDING = 1  # Chunk demandé au générateur, tuiles pas encore écrites
+SLOT_READY = 2    # Tuiles écrites, le rendu peut les lire
+world_service = None  # État du service (voir start_world_service), None = génération locale
+
+# Monde prégénéré (voir run_pregen) : en-tête puis enregistrements de taille fixe, en spirale
+PREGEN_MAGIC = b"ATOW"
+PREGEN_VERSION = 1
+PREGEN_HEADER = struct.Struct("<4sHHH")  # Signature, version, TS, CHUNK_SIZE
+PREGEN_RECORD = struct.Struct("<ii")     # En-tête d'enregistrement : cx, cy (suivi des tuiles, 1 octet chacune)
+pregen_world = None  # Fichier prégénéré ouvert par open_pregen_world, None = aucun
+
+# Modifications du monde : calque creux par chunk appliqué sur la génération, journal en ajout seul
+EDIT_LOG_MAGIC = b"ATOE"
+EDIT_LOG_HEADER = struct.Struct("<4sHH")  # Signature, TS, CHUNK_SIZE
+EDIT_LOG_RECORD = struct.Struct("<iiHB")  # cx, cy, index de la tuile, type de tuile
+EDIT_LOG_COMPACT_MIN = 1024  # Nombre d'enregistrements en dessous duquel le journal n'est jamais compacté
+chunk_edits = {}  # (cx, cy) -> {index de tuile: type de tuile}, uniquement pour les chunks modifiés
+edits_geometry = None  # (TS, CHUNK_SIZE) des index de chunk_edits, fixé à la première modification
+edit_log = None  # Journal ouvert par open_edit_log : {'path', 'file', 'records'}
+export_thread = None  # Export PNG lancé depuis la console (voir start_map_export)
+
+# Fenêtre (créée par init_display, pas à l'import : les processus de génération n'ouvrent pas de fenêtre)
+RENDER_BACKENDS = ('surface', 'sdl2', 'sdl2-software')  # Surface logicielle, textures SDL2, textures SDL2 en rendu logiciel
 fullscreen = False
-screen = pygame.display.set_mode((DESKTOP_W, DESKTOP_H), pygame.RESIZABLE)
-pygame.display.set_caption("A.T.O")
-clock = pygame.time.Clock()
-font = pygame.font.Font(None, 24)
+screen = None  # Surface d'écran ; avec le backend SDL2, calque transparent des menus et de la console
+sdl_window = None  # Fenêtre SDL2 (backend SDL2 uniquement)
+renderer = None  # Renderer SDL2, None = dessin sur la surface d'écran
+texture_cache = {}  # Textures SDL2 déjà envoyées : Surface -> Texture
+RENDER_THREADS = 0  # Threads dessinant le sol par bandes horizontales (0 = dans le thread principal)
+RENDER_STRIPS_PER_THREAD = 2  # Bandes par thread, pour équilibrer les bandes plus chargées
+render_pool = None  # ThreadPoolExecutor du rendu par bandes, recréé si RENDER_THREADS change
+render_pool_threads = 0  # Nombre de threads de render_pool
+clock = None
+font = None
+DESKTOP_W = SCREEN_W  # Largeur de l'écran du bureau
+DESKTOP_H = SCREEN_H  # Hauteur de l'écran du bureau
+
+def init_display(backend='surface'):
+    """
+    Initialise pygame et crée la fenêtre du jeu.
+    Appelée uniquement par game_engine() : importer ce module (processus de génération,
+    outils en ligne de commande) n'ouvre aucune fenêtre.
+    Avec le backend 'sdl2' (ou 'sdl2-software'), le monde est dessiné par un Renderer SDL2
+    à partir de textures envoyées une seule fois ; screen devient le calque des menus.
+    """
+    global screen, clock, font, DESKTOP_W, DESKTOP_H, sdl_window, renderer
+    pygame.init()
+    info = pygame.display.Info()
+    DESKTOP_W = info.current_w
+    DESKTOP_H = info.current_h
+    if backend != 'surface' and Renderer is None:
+        print("pygame._sdl2 indisponible : utilisation du backend surface")
+        backend = 'surface'
+    if backend == 'surface':
+        screen = pygame.display.set_mode((DESKTOP_W, DESKTOP_H), pygame.RESIZABLE)
+        pygame.display.set_caption("A.T.O")
+    else:
+        sdl_window = Window("A.T.O", (DESKTOP_W, DESKTOP_H), resizable=True)
+        renderer = Renderer(sdl_window, accelerated=0 if backend == 'sdl2-software' else -1)
+        screen = pygame.Surface((DESKTOP_W, DESKTOP_H), pygame.SRCALPHA)
+    clock = pygame.time.Clock()
+    font = pygame.font.Font(None, 24)
+
+def resize_display(width, height, full=False):
+    """
+    Recrée la surface d'écran après un redimensionnement ou un passage en plein écran.
+    """
+    global screen
+    if renderer is None:
+        screen = pygame.display.set_mode((width, height), pygame.FULLSCREEN if full else pygame.RESIZABLE)
+    else:
+        if full:
+            sdl_window.set_fullscreen(desktop=True)
+        else:
+            sdl_window.set_windowed()
+        screen = pygame.Surface((width, height), pygame.SRCALPHA)
+
+def get_texture(image):
+    """
+    Retourne la texture SDL2 d'une image, envoyée à la carte graphique au premier appel.
+    """
+    texture = texture_cache.get(image)
+    if texture is None:
+        texture = Texture.from_surface(renderer, image)
+        texture_cache[image] = texture
+    return texture
+
+def clear_screen(color):
+    """
+    Remplit l'écran d'une couleur (et vide le calque des menus avec le backend SDL2).
+    """
+    if renderer is None:
+        screen.fill(color)
+    else:
+        renderer.draw_color = pygame.Color(color)
+        renderer.clear()
+        screen.fill((0, 0, 0, 0))
+
+def fill_rect(color, rect, surface=None):
+    """
+    Dessine un rectangle plein sur le backend de rendu actif,
+    ou sur surface si elle est donnée (bande du rendu multithread).
+    """
+    if surface is not None:
+        surface.fill(color, rect)
+    elif renderer is None:
+        pygame.draw.rect(screen, color, rect)
+    else:
+        renderer.draw_color = pygame.Color(color)
+        renderer.fill_rect(rect)
+
+def blit_image(image, pos, area=None, cache=True, surface=None):
+    """
+    Dessine une image (ou la portion area) en pos sur le backend de rendu actif,
+    ou sur surface si elle est donnée (bande du rendu multithread).
+    cache=False pour une image éphémère (texte), qui n'est pas gardée en texture.
+    """
+    if surface is not None:
+        surface.blit(image, pos, area)
+    elif renderer is None:
+        screen.blit(image, pos, area)
+    else:
+        texture = get_texture(image) if cache else Texture.from_surface(renderer, image)
+        if area is None:
+            texture.draw(dstrect=pos)
+        else:
+            texture.draw(srcrect=area, dstrect=(pos[0], pos[1], area[2], area[3]))
+
+def blit_batch(blits):
+    """
+    Dessine une liste de (image, pos) ou (image, pos, area) en une passe.
+    """
+    if renderer is None:
+        screen.blits(blits, doreturn=False)
+    else:
+        for blit in blits:
+            blit_image(*blit)
+
+def present(overlay=False):
+    """
+    Affiche l'image dessinée. Avec le backend SDL2, overlay=True superpose le calque
+    des menus (pause, console, menu principal), envoyé comme texture.
+    """
+    if renderer is None:
+        pygame.display.flip()
+    else:
+        if overlay:
+            Texture.from_surface(renderer, screen).draw()
+        renderer.present()
 
 def load_grass_tiles():
     """
@@ -146,37 +388,103 @@ def load_grass_tiles():
                 break
     print(f"Chargé {len(grass_tiles)} images de fields + field_38 depuis {base_path if 'base_path' in locals() else 'aucun chemin trouvé'}")
 
-def load_tree_tiles():
+# Dossiers des variantes avec ombre, selon SHADOW_STYLE
+TREE_SHADOW_DIRS = {
+    'shadow': "Trees_shadow",
+    'texture': "Trees_texture_shadow",
+    'texture_dark': "Trees_texture_shadow_dark",
+}
+
+def extract_shadow(tree, tree_with_shadow):
     """
-    Charge uniquement les images Tree1.png, Tree2.png, Tree3.png depuis le dossier assets/Trees.
-    Cherche dans plusieurs emplacements possibles et redimensionne les images à la taille des tuiles.
+    Isole l'ombre d'une variante d'arbre : seuls les pixels où la variante diffère
+    de l'arbre seul sont gardés, les autres deviennent transparents. L'ombre peut
+    ainsi être dessinée dans une passe séparée, sous tous les arbres.
+    Retourne None si la variante n'ajoute aucun pixel visible (pas d'ombre à dessiner).
     """
-    global tree_tiles
-    tree_tiles = []
+    size = tree.get_size()
+    if tree_with_shadow.get_size() != size:
+        return None
+    plain = pygame.image.tobytes(tree, 'RGBA')
+    shaded = pygame.image.tobytes(tree_with_shadow, 'RGBA')
+    pixels = bytearray(len(shaded))
+    visible = False
+    for i in range(0, len(shaded), 4):
+        if shaded[i:i + 4] != plain[i:i + 4] and shaded[i + 3] > 0:
+            pixels[i:i + 4] = shaded[i:i + 4]
+            visible = True
+    if not visible:
+        return None
+    return pygame.image.frombytes(bytes(pixels), size, 'RGBA')
+
+def load_tree_sprites():
+    """
+    Charge les jeux d'arbres utilisés par les biomes (Tree1.png, Snow_tree1.png, ...) depuis
+    le dossier assets/Trees, avec leur ombre : (image, ombre ou None, décalage de l'ombre).
+    Les images gardent leurs proportions (TREE_ASSET_TS pixels par tuile) : les grands
+    arbres débordent sur les tuiles voisines et sont triés en profondeur par le calque de sprites.
+    """
+    global tree_sets, tree_sprites_ts, tree_sprite_reach
+    tree_sets = {}
+    tree_sprites_ts = DISPLAY_TS
+    tree_sprite_reach = 0
+    chunk_sprites.clear()
+    visible_sprites.clear()
+    texture_cache.clear()
     # Chemins possibles pour trouver les assets
     base_paths = [
-        "desktop/assets/Trees",
-        "assets/Trees",
-        os.path.join(os.path.dirname(__file__), "assets", "Trees"),
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "desktop", "assets", "Trees")
+        "desktop/assets",
+        "assets",
+        os.path.join(os.path.dirname(__file__), "assets"),
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "desktop", "assets")
     ]
-    # Liste des fichiers d'arbres à charger
-    tree_names = ["Tree1.png", "Tree2.png", "Tree3.png"]
+    prefixes = sorted(set(biome[1] for biome in BIOMES))
+    # convert_alpha() accélère les blits mais demande une fenêtre ouverte
+    can_convert = pygame.display.get_init() and pygame.display.get_surface() is not None
     for base_path in base_paths:
-        if os.path.exists(base_path):
-            # Charge uniquement Tree1, Tree2, Tree3
+        if not os.path.exists(os.path.join(base_path, "Trees")):
+            continue
+        file_names = sorted(os.listdir(os.path.join(base_path, "Trees")))
+        for prefix in prefixes:
+            # Tree1.png, Palm_tree1_2.png... : le préfixe est suivi d'un chiffre
+            tree_names = [name for name in file_names
+                          if name.startswith(prefix) and name[len(prefix):len(prefix) + 1].isdigit() and name.endswith(".png")]
+            sprites = []
             for tree_name in tree_names:
-                tree_path = os.path.join(base_path, tree_name)
-                if os.path.exists(tree_path):
-                    try:
-                        tree = pygame.image.load(tree_path)
-                        tree = pygame.transform.scale(tree, (DISPLAY_TS, DISPLAY_TS))
-                        tree_tiles.append(tree)
-                    except Exception as e:
-                        print(f"Erreur chargement {tree_path}: {e}")
-            if len(tree_tiles) > 0:
-                break
-    print(f"Chargé {len(tree_tiles)} images d'arbres (Tree1-3) depuis {base_path if 'base_path' in locals() else 'aucun chemin trouvé'}")
+                tree_path = os.path.join(base_path, "Trees", tree_name)
+                try:
+                    tree = pygame.image.load(tree_path)
+                    shadow = None
+                    if SHADOW_STYLE in TREE_SHADOW_DIRS:
+                        shadow_path = os.path.join(base_path, TREE_SHADOW_DIRS[SHADOW_STYLE], tree_name)
+                        if os.path.exists(shadow_path):
+                            shadow = extract_shadow(tree, pygame.image.load(shadow_path))
+                    w = tree.get_width() * DISPLAY_TS // TREE_ASSET_TS
+                    h = tree.get_height() * DISPLAY_TS // TREE_ASSET_TS
+                    tree = pygame.transform.scale(tree, (w, h))
+                    if shadow is not None:
+                        shadow = pygame.transform.scale(shadow, (w, h))
+                    if can_convert:
+                        tree = tree.convert_alpha()
+                        if shadow is not None:
+                            shadow = shadow.convert_alpha()
+                    # L'ombre est recadrée sur ses pixels visibles (une petite partie de l'image) :
+                    # son décalage par rapport au coin haut gauche de l'arbre est gardé à côté
+                    shadow_offset = (0, 0)
+                    if shadow is not None:
+                        bounds = shadow.get_bounding_rect()
+                        shadow = shadow.subsurface(bounds).copy() if bounds.width > 0 else None
+                        shadow_offset = (bounds.x, bounds.y)
+                    sprites.append((tree, shadow, shadow_offset))
+                    tree_sprite_reach = max(tree_sprite_reach, w // DISPLAY_SCALE, h // DISPLAY_SCALE)
+                except Exception as e:
+                    print(f"Erreur chargement {tree_path}: {e}")
+            if len(sprites) > 0:
+                tree_sets[prefix] = sprites
+        if len(tree_sets) > 0:
+            break
+    count = sum(len(sprites) for sprites in tree_sets.values())
+    print(f"Chargé {count} sprites d'arbres ({len(tree_sets)} jeux) depuis {base_path if 'base_path' in locals() else 'aucun chemin trouvé'}")
 
 def get_chunk_key(cx, cy):
     """
@@ -288,45 +596,110 @@ def check_neighbors(chunk, tx, ty, tile_type):
                 count += 1
     return count
 
-def is_forest_biome(cx, cy):
+def lattice_value(ix, iy, salt):
     """
-    Détermine si un chunk doit être un biome forêt.
-    Utilise les coordonnées du chunk pour une génération déterministe.
+    Valeur pseudo-aléatoire déterministe (entre 0 et 1) en un point entier du réseau de bruit.
     """
-    seed = get_seed(0, 0, cx, cy)
-    # 30% de chance qu'un chunk soit une forêt
-    return (seed % 100) < 30
+    return ((get_seed(ix, iy, salt, salt) >> 7) & 0xFFFF) / 65535.0
 
-def generate_forest_biome(chunk, cx, cy):
+def value_noise(x, y, salt):
     """
-    Génère un biome forêt avec des arbres groupés de manière naturelle.
-    Les arbres ont tendance à se regrouper pour créer des zones forestières.
+    Bruit de valeur en (x, y) : interpolation lissée des valeurs du réseau entier.
     """
-    # Première passe : place des "graines" d'arbres (points de départ)
-    for ty in range(CHUNK_TILES):
-        for tx in range(CHUNK_TILES):
-            # 3% de chance de placer une graine d'arbre
-            if random_chance(tx, ty, 0.03, cx, cy):
-                set_tile(chunk, tx, ty, T_TREE)
-    
-    # Deuxième passe : fait pousser les arbres autour des graines
-    # Plusieurs itérations pour créer des groupes plus denses
-    for _ in range(2):
-        for ty in range(CHUNK_TILES):
-            for tx in range(CHUNK_TILES):
-                if get_tile(chunk, tx, ty) == T_GRASS:
-                    neighbors = check_neighbors(chunk, tx, ty, T_TREE)
-                    # Si un arbre a au moins 2 voisins arbres, il a 40% de chance de pousser
-                    if neighbors >= 2:
-                        if random_chance(tx, ty, 0.4, cx, cy):
-                            set_tile(chunk, tx, ty, T_TREE)
-                    # Si un arbre a 1 voisin, 15% de chance
-                    elif neighbors == 1:
-                        if random_chance(tx, ty, 0.15, cx, cy):
-                            set_tile(chunk, tx, ty, T_TREE)
-                    # Sinon, 2% de chance isolée
-                    elif random_chance(tx, ty, 0.02, cx, cy):
-                        set_tile(chunk, tx, ty, T_TREE)
+    ix = int(x // 1)
+    iy = int(y // 1)
+    fx = x - ix
+    fy = y - iy
+    fx = fx * fx * (3 - 2 * fx)
+    fy = fy * fy * (3 - 2 * fy)
+    top = lattice_value(ix, iy, salt) + (lattice_value(ix + 1, iy, salt) - lattice_value(ix, iy, salt)) * fx
+    bottom = lattice_value(ix, iy + 1, salt) + (lattice_value(ix + 1, iy + 1, salt) - lattice_value(ix, iy + 1, salt)) * fx
+    return top + (bottom - top) * fy
+
+def biome_corner(gx, gy, salt):
+    """
+    Valeur d'un champ de biome (température ou humidité, entre 0 et 1) au coin (gx, gy)
+    d'un chunk : somme de plusieurs octaves de bruit (BIOME_OCTAVES).
+    Mise en cache : chaque coin sert aux quatre chunks qui le partagent.
+    """
+    key = (salt, gx, gy)
+    value = biome_corner_cache.get(key)
+    if value is None:
+        value = 0.0
+        weight = 1.0
+        total = 0.0
+        for cell in BIOME_OCTAVES:
+            value += value_noise(gx / cell, gy / cell, salt) * weight
+            total += weight
+            weight *= 0.5
+        value = min(1.0, max(0.0, (value / total - 0.5) * BIOME_CONTRAST + 0.5))
+        if len(biome_corner_cache) >= MAX_CHUNKS_LOADED * 8:
+            biome_corner_cache.clear()
+        biome_corner_cache[key] = value
+    return value
+
+def fill_noise_field(cx, cy, cell, corner, salt):
+    """
+    Retourne un tableau (CHUNK_TILES, CHUNK_TILES) obtenu par interpolation bilinéaire
+    d'un réseau de pas `cell` tuiles. corner(gx, gy, salt) donne la valeur d'un nœud du réseau.
+    Les nœuds sont alignés sur les coordonnées monde : le champ est continu entre chunks.
+    """
+    n = CHUNK_TILES
+    tiles_x = np.arange(cx * n, cx * n + n)
+    tiles_y = np.arange(cy * n, cy * n + n)
+    gx = tiles_x // cell
+    gy = tiles_y // cell
+    gx0 = int(gx[0])
+    gy0 = int(gy[0])
+    # Seuls les quelques nœuds qui entourent le chunk sont évalués
+    nodes = np.array([[corner(x, y, salt) for x in range(gx0, int(gx[-1]) + 2)]
+                      for y in range(gy0, int(gy[-1]) + 2)])
+    ix = gx - gx0
+    iy = (gy - gy0)[:, None]
+    fx = (tiles_x - gx * cell + 0.5) / cell
+    fy = ((tiles_y - gy * cell + 0.5) / cell)[:, None]
+    left = nodes[iy, ix] + (nodes[iy + 1, ix] - nodes[iy, ix]) * fy
+    right = nodes[iy, ix + 1] + (nodes[iy + 1, ix + 1] - nodes[iy, ix + 1]) * fy
+    return left + (right - left) * fx
+
+def get_chunk_biomes(cx, cy):
+    """
+    Retourne le biome de chaque tuile d'un chunk (bytes, index ty * CHUNK_TILES + tx),
+    déduit des champs de température et d'humidité (voir BIOME_GRID).
+    """
+    key = (cx, cy)
+    biomes = chunk_biome_cache.get(key)
+    if biomes is None:
+        # Un nœud par coin de chunk : les champs de biome varient lentement
+        temperature = fill_noise_field(cx, cy, CHUNK_TILES, biome_corner, SALT_TEMPERATURE)
+        moisture = fill_noise_field(cx, cy, CHUNK_TILES, biome_corner, SALT_MOISTURE)
+        rows = len(BIOME_GRID)
+        columns = len(BIOME_GRID[0])
+        row = np.minimum(rows - 1, (temperature * rows).astype(np.intp))
+        column = np.minimum(columns - 1, (moisture * columns).astype(np.intp))
+        biomes = np.take(BIOME_GRID, row * columns + column).astype(np.uint8).tobytes()
+        if len(chunk_biome_cache) >= MAX_CHUNKS_LOADED * 2:
+            chunk_biome_cache.clear()
+        chunk_biome_cache[key] = biomes
+    return biomes
+
+def generate_biome_trees(chunk, cx, cy):
+    """
+    Place les arbres selon la densité du biome de chaque tuile. La densité est modulée
+    par un champ de couverture (bosquets de TREE_COVER_CELL tuiles) pour que les arbres
+    se regroupent en forêts plutôt que d'être dispersés uniformément.
+    """
+    biomes = np.frombuffer(get_chunk_biomes(cx, cy), np.uint8)
+    cover = fill_noise_field(cx, cy, TREE_COVER_CELL, lattice_value, SALT_COVER).ravel()
+    densities = np.array([biome[2] * 3000 for biome in BIOMES])  # Seuils sur 1000, couverture au carré (moyenne ~1/3)
+    tiles = np.arange(CHUNK_TILES * CHUNK_TILES, dtype=np.int64)
+    # Même hachage que get_seed(tx, ty, cx, cy) : les 31 bits gardés ne dépendent
+    # pas du dépassement des entiers 64 bits
+    seed = ((tiles % CHUNK_TILES) * 73856093) ^ ((tiles // CHUNK_TILES) * 19349663) \
+        ^ ((cx * 83492791) ^ (cy * 19283746))
+    seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+    for i in np.flatnonzero((seed >> 4) % 1000 < densities[biomes] * cover * cover):
+        chunk[i] = T_TREE
 
 def generate_chunk(cx, cy):
     """
@@ -338,8 +711,8 @@ def generate_chunk(cx, cy):
     - set_tile(chunk, tx, ty, tile_type) : Place une tuile
     - get_tile(chunk, tx, ty) : Lit une tuile
     - check_neighbors(chunk, tx, ty, tile_type) : Compte les voisins d'un type
-    - is_forest_biome(cx, cy) : Vérifie si le chunk est une forêt
-    - generate_forest_biome(chunk, cx, cy) : Génère un biome forêt
+    - get_chunk_biomes(cx, cy) : Biome de chaque tuile (index dans BIOMES)
+    - generate_biome_trees(chunk, cx, cy) : Place les arbres de chaque biome
     
     Exemples d'utilisation :
     - random_chance(tx, ty, 0.05, cx, cy) : 5% de chance
@@ -347,30 +720,80 @@ def generate_chunk(cx, cy):
     """
     chunk = [T_GRASS] * (CHUNK_TILES * CHUNK_TILES)
     
-    # Génération de biome forêt
-    if is_forest_biome(cx, cy):
-        generate_forest_biome(chunk, cx, cy)
+    # Arbres des biomes (température et humidité, voir BIOMES)
+    generate_biome_trees(chunk, cx, cy)
     
-    # Vous pouvez ajouter d'autres biomes ici :
-    # elif is_desert_biome(cx, cy):
-    #     generate_desert_biome(chunk, cx, cy)
+    # Vous pouvez ajouter d'autres structures ici, par exemple selon get_chunk_biomes(cx, cy)
     
     return chunk
 
-def load_chunk(cx, cy):
+def store_chunk(key, chunk):
     """
-    Charge un chunk en mémoire. Utilise un système LRU (Least Recently Used)
+    Ajoute un chunk généré à la mémoire. Utilise un système LRU (Least Recently Used)
     pour limiter le nombre de chunks chargés.
     """
+    # Si on atteint la limite, supprime le chunk le plus ancien
+    if len(chunks_loaded) >= MAX_CHUNKS_LOADED:
+        evict_chunk(chunks_order[0])
+    chunks_loaded[key] = chunk
+    chunks_order.append(key)
+    apply_chunk_edits(key, chunk)
+    chunk_walls[key] = build_walls_mask(chunk)
+    invalidate_chunk_paths(key)
+    if key in entity_blocks:
+        suspended_entity_chunks.pop(key, None)
+    else:
+        spawn_chunk_entities(key, chunk)
+
+def evict_chunk(key):
+    """
+    Retire un chunk de la mémoire (éviction LRU ou éloignement de la caméra).
+    En mode service, rend aussi son slot de mémoire partagée au générateur.
+    """
+    chunk = chunks_loaded.pop(key)
+    if key in chunks_order:
+        chunks_order.remove(key)
+    chunk_sprites.pop(key, None)
+    chunk_walls.pop(key, None)
+    chunk_biome_cache.pop(key, None)
+    suspend_chunk_entities(key)
+    if world_service is not None and key in world_service['slots']:
+        release_service_slot(key, chunk)
+
+def forget_loaded_chunks():
+    """
+    Oublie tous les chunks chargés et les tables qui en dépendent (sprites, masques de
+    marchabilité, biomes, chemins en cache), par exemple quand TS ou CHUNK_SIZE changent.
+    Contrairement à evict_chunk, ne rend pas les slots du service (ils sont recréés).
+    """
+    chunks_loaded.clear()
+    chunks_order.clear()
+    chunk_sprites.clear()
+    visible_sprites.clear()
+    chunk_walls.clear()
+    chunk_biome_cache.clear()
+    path_cache.clear()
+    path_cache_by_chunk.clear()
+    clear_entities()
+
+def load_chunk(cx, cy):
+    """
+    Charge un chunk en mémoire (voir store_chunk pour la limite LRU).
+    Le chunk est lu dans le monde prégénéré s'il y figure. Sinon, en mode service,
+    il est demandé au processus générateur et None est retourné tant qu'il n'est
+    pas prêt (la zone est alors dessinée en noir).
+    """
     key = get_chunk_key(cx, cy)
     if key not in chunks_loaded:
-        # Si on atteint la limite, supprime le chunk le plus ancien
-        if len(chunks_loaded) >= MAX_CHUNKS_LOADED:
-            old_key = chunks_order.pop(0)
-            del chunks_loaded[old_key]
-        chunk = generate_chunk(cx, cy)
-        chunks_loaded[key] = chunk
-        chunks_order.append(key)
+        chunk = read_pregen_chunk(key)
+        if chunk is not None:
+            store_chunk(key, chunk)
+        elif world_service is not None:
+            if key not in world_service['pending']:
+                request_service_chunk(key)
+            return None
+        else:
+            store_chunk(key, generate_chunk(cx, cy))
     return chunks_loaded[key]
 
 def unload_distant_chunks(cam_x, cam_y):
@@ -386,9 +809,756 @@ def unload_distant_chunks(cam_x, cam_y):
         if abs(cx - cam_cx) > view_range or abs(cy - cam_cy) > view_range:
             keys_to_remove.append(key)
     for key in keys_to_remove:
-        del chunks_loaded[key]
-        if key in chunks_order:
-            chunks_order.remove(key)
+        evict_chunk(key)
+
+def build_walls_mask(chunk):
+    """
+    Construit le masque de marchabilité d'un chunk : un entier dont le bit
+    ty * CHUNK_TILES + tx vaut 1 si la tuile (tx, ty) bloque le passage.
+    """
+    bits = ''.join('1' if tile in BLOCKING_TILES else '0' for tile in reversed(chunk))
+    return int(bits, 2) if bits else 0
+
+def is_blocked_tile(wtx, wty):
+    """
+    Indique si la tuile monde (wtx, wty) bloque le passage.
+    Quelques opérations sur le masque du chunk ; un chunk non chargé est bloquant.
+    """
+    walls = chunk_walls.get((wtx // CHUNK_TILES, wty // CHUNK_TILES))
+    if walls is None:
+        return True
+    return (walls >> ((wty % CHUNK_TILES) * CHUNK_TILES + wtx % CHUNK_TILES)) & 1 == 1
+
+def blocked_tiles(wx, wy, half):
+    """
+    Retourne l'ensemble des tuiles bloquantes touchées par une boîte centrée
+    en (wx, wy), de demi-côté half (pixels logiques).
+    """
+    return {(wtx, wty)
+            for wty in range((wy - half) // TS, (wy + half - 1) // TS + 1)
+            for wtx in range((wx - half) // TS, (wx + half - 1) // TS + 1)
+            if is_blocked_tile(wtx, wty)}
+
+def move_with_collision(wx, wy, dx, dy):
+    """
+    Déplace le joueur de (dx, dy) en glissant le long des obstacles : chaque axe
+    est testé séparément. Un pas est refusé s'il touche une tuile bloquante que
+    la boîte ne touchait pas déjà : un joueur coincé (apparu dans un arbre) peut
+    sortir, mais pas traverser d'autres obstacles ni entrer dans un chunk non chargé.
+    """
+    half = PS // (2 * DISPLAY_SCALE)
+    if dx and blocked_tiles(wx + dx, wy, half) <= blocked_tiles(wx, wy, half):
+        wx += dx
+    if dy and blocked_tiles(wx, wy + dy, half) <= blocked_tiles(wx, wy, half):
+        wy += dy
+    return wx, wy
+
+def invalidate_chunk_paths(key):
+    """
+    Oublie les chemins en cache qui traversent un chunk dont les tuiles ont changé.
+    """
+    for path_key in path_cache_by_chunk.pop(key, ()):
+        path_cache.pop(path_key, None)
+
+def find_path(start, goal):
+    """
+    Cherche un chemin (A*, 4 directions) entre deux tuiles monde, à travers les
+    chunks chargés. Retourne la liste des tuiles à parcourir (sans le départ),
+    ou None si l'arrivée est inaccessible ou trop lointaine (MAX_PATH_NODES).
+    Les chemins trouvés sont gardés en cache jusqu'à modification d'un chunk traversé.
+    """
+    path_key = (start, goal)
+    if path_key in path_cache:
+        return path_cache[path_key]
+    if is_blocked_tile(*goal):
+        return None
+    gx, gy = goal
+    came_from = {start: None}
+    costs = {start: 0}
+    heap = [(abs(start[0] - gx) + abs(start[1] - gy), 0, start)]
+    explored = 0
+    while heap and explored < MAX_PATH_NODES:
+        _, cost, node = heapq.heappop(heap)
+        if node == goal:
+            path = []
+            while node != start:
+                path.append(node)
+                node = came_from[node]
+            path.reverse()
+            path_cache[path_key] = path
+            for wtx, wty in [start] + path:
+                path_cache_by_chunk.setdefault((wtx // CHUNK_TILES, wty // CHUNK_TILES), set()).add(path_key)
+            return path
+        if cost > costs[node]:
+            continue
+        explored += 1
+        x, y = node
+        for nxt in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if is_blocked_tile(*nxt):
+                continue
+            new_cost = cost + 1
+            if new_cost < costs.get(nxt, new_cost + 1):
+                costs[nxt] = new_cost
+                came_from[nxt] = node
+                heapq.heappush(heap, (new_cost + abs(nxt[0] - gx) + abs(nxt[1] - gy), new_cost, nxt))
+    return None
+
+def follow_path(wx, wy, path):
+    """
+    Fait avancer le joueur vers la prochaine tuile du chemin (retirée une fois atteinte).
+    Retourne les nouvelles coordonnées monde.
+    """
+    wtx, wty = path[0]
+    dx = max(-SPD, min(SPD, wtx * TS + TS // 2 - wx))
+    dy = max(-SPD, min(SPD, wty * TS + TS // 2 - wy))
+    new_x, new_y = move_with_collision(wx, wy, dx, dy)
+    if (new_x, new_y) == (wtx * TS + TS // 2, wty * TS + TS // 2):
+        path.pop(0)
+    elif (new_x, new_y) == (wx, wy):
+        # Bloqué (tuile modifiée depuis le calcul) : abandonne le chemin
+        path.clear()
+    return new_x, new_y
+
+def world_service_worker(shm_name, slot_count, ts, chunk_size, requests):
+    """
+    Boucle du processus générateur : reçoit des demandes (cx, cy, slot) et écrit
+    les tuiles générées directement dans le slot de mémoire partagée.
+    Le drapeau SLOT_READY est écrit en dernier, après les tuiles et les coordonnées,
+    ce qui permet au rendu de lire le slot sans verrou.
+    Une demande None arrête le processus.
+    """
+    global TS, CHUNK_SIZE, CHUNK_TILES
+    # Le processus peut avoir été lancé par spawn : on reprend la configuration du jeu
+    TS = ts
+    CHUNK_SIZE = chunk_size
+    CHUNK_TILES = CHUNK_SIZE // TS
+    tile_count = CHUNK_TILES * CHUNK_TILES
+    slot_size = SLOT_HEADER_SIZE + tile_count
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            cx, cy, slot = request
+            base = slot * slot_size
+            shm.buf[base + SLOT_HEADER_SIZE:base + slot_size] = bytes(generate_chunk(cx, cy))
+            struct.pack_into("<ii", shm.buf, base + 4, cx, cy)
+            shm.buf[base] = SLOT_READY
+    finally:
+        shm.close()
+
+def start_world_service(slot_count=None):
+    """
+    Lance le processus générateur et alloue la mémoire partagée découpée en slots
+    de taille fixe (un chunk par slot). Les chunks sont ensuite lus directement dans
+    leur slot par get_tile_in_chunk, sans copie ni sérialisation.
+    """
+    global world_service
+    if world_service is not None:
+        return
+    if slot_count is None:
+        # Chunks chargés + la zone préchargée autour de la caméra (5x5)
+        slot_count = MAX_CHUNKS_LOADED + 25
+    slot_size = SLOT_HEADER_SIZE + CHUNK_TILES * CHUNK_TILES
+    shm = shared_memory.SharedMemory(create=True, size=slot_count * slot_size)
+    for slot in range(slot_count):
+        shm.buf[slot * slot_size] = SLOT_FREE
+    # spawn : le générateur n'hérite ni de la fenêtre SDL ni des threads (rendu, export) du jeu
+    context = multiprocessing.get_context("spawn")
+    requests = context.Queue()
+    process = context.Process(target=world_service_worker,
+                                      args=(shm.name, slot_count, TS, CHUNK_SIZE, requests),
+                                      daemon=True)
+    process.start()
+    # Les chunks générés localement avant le lancement ne sont pas dans un slot
+    forget_loaded_chunks()
+    world_service = {
+        'shm': shm,
+        'process': process,
+        'requests': requests,
+        'slot_size': slot_size,
+        'slots': {},  # Table des slots : (cx, cy) -> numéro de slot
+        'free': list(range(slot_count - 1, -1, -1)),  # Slots libres (pile)
+        'pending': set(),  # Clés demandées au générateur, pas encore prêtes
+    }
+    print(f"Service de génération lancé : {slot_count} slots de {slot_size} octets")
+
+def stop_world_service():
+    """
+    Arrête le processus générateur et libère la mémoire partagée.
+    Les chunks chargés pointent dans la mémoire partagée : ils sont oubliés.
+    """
+    global world_service
+    if world_service is None:
+        return
+    service = world_service
+    world_service = None
+    service['requests'].put(None)
+    service['process'].join(timeout=2)
+    if service['process'].is_alive():
+        service['process'].terminate()
+    # Les vues sur les slots doivent être relâchées avant de fermer la mémoire partagée
+    for chunk in chunks_loaded.values():
+        if isinstance(chunk, memoryview):
+            chunk.release()
+    forget_loaded_chunks()
+    service['shm'].close()
+    service['shm'].unlink()
+
+def request_service_chunk(key):
+    """
+    Réserve un slot libre et demande la génération du chunk au processus générateur.
+    S'il n'y a plus de slot libre, la demande sera refaite à la prochaine image.
+    """
+    service = world_service
+    if not service['free']:
+        return
+    slot = service['free'].pop()
+    service['shm'].buf[slot * service['slot_size']] = SLOT_PENDING
+    service['slots'][key] = slot
+    service['pending'].add(key)
+    service['requests'].put((key[0], key[1], slot))
+
+def release_service_slot(key, chunk):
+    """
+    Rend le slot d'un chunk évincé au générateur.
+    """
+    service = world_service
+    slot = service['slots'].pop(key)
+    chunk.release()
+    service['shm'].buf[slot * service['slot_size']] = SLOT_FREE
+    service['free'].append(slot)
+
+def restart_world_service():
+    """
+    Appelée quand TS ou CHUNK_SIZE changent : relance le service (la taille des slots
+    change) ou, sans service, oublie les chunks générés avec l'ancienne géométrie.
+    """
+    if world_service is not None:
+        stop_world_service()
+        start_world_service()
+    else:
+        forget_loaded_chunks()
+
+def poll_world_service():
+    """
+    Intègre les chunks dont le slot est passé à SLOT_READY.
+    Le chunk stocké est une vue mémoire sur le slot : aucune copie des tuiles.
+    """
+    if world_service is None:
+        return
+    service = world_service
+    buf = service['shm'].buf
+    slot_size = service['slot_size']
+    for key in list(service['pending']):
+        base = service['slots'][key] * slot_size
+        if buf[base] == SLOT_READY:
+            service['pending'].remove(key)
+            store_chunk(key, buf[base + SLOT_HEADER_SIZE:base + slot_size])
+
+def apply_chunk_edits(key, chunk):
+    """
+    Applique les modifications du joueur sur un chunk tout juste généré (ou lu).
+    Un chunk jamais modifié reste une pure régénération.
+    """
+    edits = chunk_edits.get(key)
+    if edits and edits_match_geometry():
+        for index, tile_type in edits.items():
+            chunk[index] = tile_type
+
+def edits_match_geometry():
+    """
+    Les index de tuiles du journal ne sont valables que pour le TS et le CHUNK_SIZE
+    avec lesquels il a été écrit.
+    """
+    return edits_geometry is None or edits_geometry == (TS, CHUNK_SIZE)
+
+def load_edit_log(path):
+    """
+    Charge le journal des modifications dans chunk_edits, en lecture seule (utilisé tel
+    quel par l'export). Les enregistrements sont rejoués dans l'ordre : le dernier
+    l'emporte. Un enregistrement incomplet en fin de fichier (arrêt brutal) est ignoré.
+    Retourne (nombre d'enregistrements, taille utile du fichier), ou None si le fichier
+    n'est pas un journal.
+    """
+    global edits_geometry
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < EDIT_LOG_HEADER.size or data[:4] != EDIT_LOG_MAGIC:
+        print(f"Erreur: {path} n'est pas un journal de modifications")
+        return None
+    _, ts, chunk_size = EDIT_LOG_HEADER.unpack_from(data)
+    end = len(data) - (len(data) - EDIT_LOG_HEADER.size) % EDIT_LOG_RECORD.size
+    records = 0
+    for cx, cy, index, tile_type in EDIT_LOG_RECORD.iter_unpack(data[EDIT_LOG_HEADER.size:end]):
+        chunk_edits.setdefault((cx, cy), {})[index] = tile_type
+        records += 1
+    edits_geometry = (ts, chunk_size)
+    return records, end
+
+def open_edit_log(path):
+    """
+    Charge le journal des modifications (s'il existe, voir load_edit_log) puis l'ouvre
+    en ajout ; un enregistrement incomplet en fin de fichier est supprimé.
+    """
+    global edit_log, edits_geometry
+    if os.path.exists(path):
+        loaded = load_edit_log(path)
+        if loaded is None:
+            return False
+        records, end = loaded
+        f = open(path, "r+b")
+        f.truncate(end)
+        f.seek(0, os.SEEK_END)
+    else:
+        records = 0
+        edits_geometry = (TS, CHUNK_SIZE)
+        f = open(path, "wb")
+        f.write(EDIT_LOG_HEADER.pack(EDIT_LOG_MAGIC, *edits_geometry))
+    edit_log = {'path': path, 'file': f, 'records': records}
+    compact_edit_log()
+    return True
+
+def close_edit_log():
+    """
+    Ferme le journal des modifications.
+    """
+    global edit_log
+    if edit_log is not None:
+        edit_log['file'].close()
+        edit_log = None
+
+def compact_edit_log():
+    """
+    Réécrit le journal avec une seule entrée par tuile modifiée quand il contient
+    trop d'enregistrements remplacés (plus du double des tuiles modifiées).
+    L'ancien journal n'est remplacé qu'une fois le nouveau entièrement écrit.
+    """
+    live = sum(len(edits) for edits in chunk_edits.values())
+    if edit_log is None or edit_log['records'] < max(EDIT_LOG_COMPACT_MIN, 2 * live):
+        return
+    path = edit_log['path']
+    edit_log['file'].close()
+    with open(path + ".tmp", "wb") as f:
+        f.write(EDIT_LOG_HEADER.pack(EDIT_LOG_MAGIC, *edits_geometry))
+        for (cx, cy), edits in chunk_edits.items():
+            for index, tile_type in edits.items():
+                f.write(EDIT_LOG_RECORD.pack(cx, cy, index, tile_type))
+    os.replace(path + ".tmp", path)
+    edit_log['file'] = open(path, "ab")
+    edit_log['records'] = live
+
+def edit_tile_at_world(wx, wy, tile_type):
+    """
+    Modifie la tuile aux coordonnées monde (wx, wy) : le chunk chargé est modifié
+    avec set_tile, la modification est gardée dans chunk_edits (réappliquée à chaque
+    rechargement du chunk) et ajoutée au journal. Le masque de marchabilité, les
+    chemins en cache et les sprites du chunk sont mis à jour.
+    Retourne False si le chunk n'est pas disponible.
+    """
+    global edits_geometry
+    cx, cy = get_chunk_coords(wx, wy)
+    key = get_chunk_key(cx, cy)
+    chunk = load_chunk(cx, cy)
+    if chunk is None or not edits_match_geometry():
+        return False
+    tx = (wx - cx * CHUNK_SIZE) // TS
+    ty = (wy - cy * CHUNK_SIZE) // TS
+    index = ty * CHUNK_TILES + tx
+    set_tile(chunk, tx, ty, tile_type)
+    edits_geometry = (TS, CHUNK_SIZE)
+    chunk_edits.setdefault(key, {})[index] = tile_type
+    if edit_log is not None:
+        edit_log['file'].write(EDIT_LOG_RECORD.pack(cx, cy, index, tile_type))
+        edit_log['file'].flush()
+        edit_log['records'] += 1
+        compact_edit_log()
+    bit = 1 << index
+    if tile_type in BLOCKING_TILES:
+        chunk_walls[key] |= bit
+    else:
+        chunk_walls[key] &= ~bit
+    invalidate_chunk_paths(key)
+    chunk_sprites.pop(key, None)
+    return True
+
+def spiral_chunks(radius):
+    """
+    Parcourt les chunks en spirale autour de l'origine, anneau par anneau,
+    jusqu'au rayon donné (inclus). L'ordre correspond à spiral_index.
+    """
+    yield (0, 0)
+    for r in range(1, radius + 1):
+        for cx in range(-r, r):          # Bord haut, vers la droite
+            yield (cx, -r)
+        for cy in range(-r, r):          # Bord droit, vers le bas
+            yield (r, cy)
+        for cx in range(r, -r, -1):      # Bord bas, vers la gauche
+            yield (cx, r)
+        for cy in range(r, -r, -1):      # Bord gauche, vers le haut
+            yield (-r, cy)
+
+def spiral_index(cx, cy):
+    """
+    Position d'un chunk dans l'ordre de spiral_chunks. Sert d'index au fichier
+    prégénéré : l'enregistrement n est le n-ième chunk de la spirale.
+    """
+    r = max(abs(cx), abs(cy))
+    if r == 0:
+        return 0
+    ring_start = (2 * r - 1) ** 2
+    if cy == -r and cx < r:
+        return ring_start + (cx + r)
+    if cx == r and cy < r:
+        return ring_start + 2 * r + (cy + r)
+    if cy == r and cx > -r:
+        return ring_start + 4 * r + (r - cx)
+    return ring_start + 6 * r + (r - cy)
+
+def peak_memory_mb():
+    """
+    Mémoire maximale utilisée (Mo) : (ce processus, le plus gros de ses processus
+    enfants terminés), ou None si la mesure n'est pas disponible sur ce système.
+    Les deux pics ne sont pas forcément simultanés : ils ne s'additionnent pas.
+    """
+    if resource is None:
+        return None
+    peaks = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+             resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return tuple(peak / unit for peak in peaks)
+
+def peak_memory_text():
+    """
+    Texte de la mémoire maximale pour les rapports de fin (pregen, export).
+    """
+    peaks = peak_memory_mb()
+    if peaks is None:
+        return "non disponible"
+    return f"{peaks[0]:.1f} Mo (processus principal), {peaks[1]:.1f} Mo (plus gros processus enfant)"
+
+def pregen_worker_init(ts, chunk_size):
+    """
+    Initialise un processus de prégénération avec la configuration du jeu.
+    """
+    global TS, CHUNK_SIZE, CHUNK_TILES
+    TS = ts
+    CHUNK_SIZE = chunk_size
+    CHUNK_TILES = CHUNK_SIZE // TS
+
+def pregen_chunk(key):
+    """
+    Génère un chunk dans un processus de prégénération et le renvoie sous forme compacte.
+    """
+    cx, cy = key
+    return cx, cy, bytes(generate_chunk(cx, cy))
+
+def run_pregen(radius, workers, out_path):
+    """
+    Génère tous les chunks dans un rayon donné autour de l'origine, sans fenêtre,
+    avec un pool de processus. Les chunks sont écrits au fil de l'eau, en spirale,
+    dans des enregistrements de taille fixe : un fichier interrompu est repris là
+    où il s'est arrêté (un enregistrement incomplet en fin de fichier est ignoré),
+    et un rayon plus grand prolonge un fichier existant.
+    """
+    record_size = PREGEN_RECORD.size + CHUNK_TILES * CHUNK_TILES
+    total = (2 * radius + 1) ** 2
+    done = 0
+    if os.path.exists(out_path):
+        f = open(out_path, "r+b")
+        header = f.read(PREGEN_HEADER.size)
+        if len(header) < PREGEN_HEADER.size:
+            print(f"Erreur: {out_path} n'est pas un monde prégénéré")
+            f.close()
+            return 1
+        magic, version, ts, chunk_size = PREGEN_HEADER.unpack(header)
+        if magic != PREGEN_MAGIC or version != PREGEN_VERSION or ts != TS or chunk_size != CHUNK_SIZE:
+            print(f"Erreur: {out_path} a été généré avec une autre configuration (TS={ts}, CHUNK_SIZE={chunk_size})")
+            f.close()
+            return 1
+        f.seek(0, os.SEEK_END)
+        done = (f.tell() - PREGEN_HEADER.size) // record_size
+        f.truncate(PREGEN_HEADER.size + done * record_size)
+        f.seek(0, os.SEEK_END)
+        print(f"Reprise : {done} chunks déjà générés dans {out_path}")
+    else:
+        f = open(out_path, "wb")
+        f.write(PREGEN_HEADER.pack(PREGEN_MAGIC, PREGEN_VERSION, TS, CHUNK_SIZE))
+    keys = list(spiral_chunks(radius))[done:]
+    print(f"Prégénération de {len(keys)} chunks (rayon {radius}, {workers} processus) -> {out_path}")
+    generated = 0
+    interrupted = False
+    start_time = time.time()
+    last_report = start_time
+    try:
+        with multiprocessing.Pool(workers, initializer=pregen_worker_init, initargs=(TS, CHUNK_SIZE)) as pool:
+            for cx, cy, tiles in pool.imap(pregen_chunk, keys, chunksize=16):
+                f.write(PREGEN_RECORD.pack(cx, cy))
+                f.write(tiles)
+                generated += 1
+                now = time.time()
+                if now - last_report >= 1.0:
+                    rate = generated / (now - start_time)
+                    print(f"  {done + generated}/{total} chunks - {rate:.0f} chunks/s")
+                    last_report = now
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        f.close()
+    elapsed = max(time.time() - start_time, 1e-9)
+    print(f"{generated} chunks générés en {elapsed:.1f} s ({generated / elapsed:.0f} chunks/s), "
+          f"mémoire max : {peak_memory_text()}")
+    if interrupted:
+        print(f"Interrompu après {done + generated}/{total} chunks : relancez la même commande pour reprendre")
+        return 1
+    return 0
+
+def open_pregen_world(path):
+    """
+    Ouvre un monde prégénéré par run_pregen. Le fichier est projeté en mémoire :
+    load_chunk y lit directement les chunks qu'il contient.
+    """
+    global pregen_world
+    with open(path, "rb") as f:
+        header = f.read(PREGEN_HEADER.size)
+        if len(header) < PREGEN_HEADER.size:
+            print(f"Erreur: {path} n'est pas un monde prégénéré")
+            return False
+        magic, version, ts, chunk_size = PREGEN_HEADER.unpack(header)
+        if magic != PREGEN_MAGIC or version != PREGEN_VERSION:
+            print(f"Erreur: {path} n'est pas un monde prégénéré")
+            return False
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    record_size = PREGEN_RECORD.size + (chunk_size // ts) ** 2
+    pregen_world = {
+        'data': data,
+        'ts': ts,
+        'chunk_size': chunk_size,
+        'record_size': record_size,
+        'count': (len(data) - PREGEN_HEADER.size) // record_size,
+    }
+    print(f"Monde prégénéré : {pregen_world['count']} chunks depuis {path}")
+    return True
+
+def read_pregen_chunk(key):
+    """
+    Lit un chunk dans le monde prégénéré, ou retourne None s'il n'y figure pas
+    (ou si TS/CHUNK_SIZE ont été modifiés depuis la console).
+    """
+    if pregen_world is None or pregen_world['ts'] != TS or pregen_world['chunk_size'] != CHUNK_SIZE:
+        return None
+    index = spiral_index(*key)
+    if index >= pregen_world['count']:
+        return None
+    offset = PREGEN_HEADER.size + index * pregen_world['record_size']
+    if PREGEN_RECORD.unpack_from(pregen_world['data'], offset) != key:
+        return None
+    start = offset + PREGEN_RECORD.size
+    # Copie modifiable (set_tile) : le fichier reste en lecture seule
+    return bytearray(pregen_world['data'][start:offset + pregen_world['record_size']])
+
+def export_worker_init(ts, chunk_size, edits, geometry):
+    """
+    Initialise un processus d'export : configuration du monde, modifications du joueur,
+    et images des tuiles et des arbres à l'échelle 1 (une tuile = TS pixels).
+    """
+    global TS, CHUNK_SIZE, CHUNK_TILES, DISPLAY_SCALE, DISPLAY_TS, chunk_edits, edits_geometry
+    TS = ts
+    CHUNK_SIZE = chunk_size
+    CHUNK_TILES = CHUNK_SIZE // TS
+    DISPLAY_SCALE = 1
+    DISPLAY_TS = TS
+    chunk_edits = edits
+    edits_geometry = geometry
+    load_grass_tiles()
+    load_tree_sprites()
+
+def export_chunk_tiles(cx, cy):
+    """
+    Génère un chunk pour l'export, avec les modifications du joueur,
+    sans passer par le cache des chunks du jeu.
+    """
+    chunk = generate_chunk(cx, cy)
+    apply_chunk_edits(get_chunk_key(cx, cy), chunk)
+    return chunk
+
+def render_export_band(task):
+    """
+    Dessine un segment de bande de l'export : les chunks cx0 à cx1 de la ligne cy, à
+    raison de tile_px pixels par tuile. Chaque chunk est dessiné à l'échelle 1 comme à
+    l'écran (draw_tile_screen, puis ombres et arbres, y compris ceux des chunks voisins
+    qui débordent), réduit à la taille voulue et copié ligne à ligne dans le segment.
+    Les arbres débordent vers le haut : la ligne cy + 1 (colonnes voisines comprises)
+    est aussi générée, et renvoyée pour servir de ligne cy à la bande suivante.
+    carry : {cx: (tuiles, biomes)} de la ligne cy, reçu de la bande précédente (ou None).
+    Retourne (lignes du segment en RGB, carry pour la bande suivante).
+    """
+    cy, cx0, cx1, tile_px, carry = task
+    tiles = {}
+    sprites = {}
+    next_carry = {}
+    for row in (cy, cy + 1):
+        for cx in range(cx0 - 1, cx1 + 2):
+            key = get_chunk_key(cx, row)
+            if row == cy and carry is not None:
+                tiles[key], chunk_biome_cache[key] = carry[cx]
+            else:
+                tiles[key] = export_chunk_tiles(cx, row)
+            sprites[key] = build_chunk_sprites(key, tiles[key])
+            if row == cy + 1:
+                next_carry[cx] = (bytes(tiles[key]), get_chunk_biomes(cx, row))
+    chunk_px = CHUNK_TILES * tile_px
+    chunk_row = chunk_px * 3
+    segment_row = (cx1 - cx0 + 1) * chunk_row
+    segment = bytearray(segment_row * chunk_px)
+    canvas = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE))
+    for cx in range(cx0, cx1 + 1):
+        ox = cx * CHUNK_SIZE
+        oy = cy * CHUNK_SIZE
+        chunk = tiles[get_chunk_key(cx, cy)]
+        for ty in range(CHUNK_TILES):
+            row = ty * CHUNK_TILES
+            for tx in range(CHUNK_TILES):
+                draw_tile_screen(tx * TS, ty * TS, chunk[row + tx], ox + tx * TS, oy + ty * TS, canvas)
+        nearby = [sprite for key in ((cx - 1, cy), (cx, cy), (cx + 1, cy), (cx - 1, cy + 1), (cx, cy + 1), (cx + 1, cy + 1))
+                  for sprite in sprites[key]
+                  if sprite[0] - sprite[3] < oy + CHUNK_SIZE and sprite[0] > oy
+                  and ox - sprite[2] < sprite[1] < ox + CHUNK_SIZE + sprite[2]]
+        nearby.sort(key=lambda sprite: (sprite[0], sprite[1]))
+        # Comme draw_sprites : toutes les ombres au sol, puis les arbres par profondeur
+        for base_y, center_x, half_w, height, tree, shadow, (dx, dy) in nearby:
+            if shadow is not None:
+                canvas.blit(shadow, (center_x - ox - tree.get_width() // 2 + dx, base_y - oy - tree.get_height() + dy))
+        for base_y, center_x, half_w, height, tree, shadow, shadow_offset in nearby:
+            canvas.blit(tree, (center_x - ox - tree.get_width() // 2, base_y - oy - tree.get_height()))
+        image = canvas if chunk_px == CHUNK_SIZE else pygame.transform.smoothscale(canvas, (chunk_px, chunk_px))
+        pixels = memoryview(pygame.image.tobytes(image, 'RGB'))
+        offset = (cx - cx0) * chunk_row
+        for y in range(chunk_px):
+            segment[offset:offset + chunk_row] = pixels[y * chunk_row:(y + 1) * chunk_row]
+            offset += segment_row
+    return segment, next_carry
+
+def write_png_chunk(f, kind, data):
+    """
+    Écrit un bloc PNG : longueur, type, données et CRC.
+    """
+    f.write(struct.pack(">I", len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+def export_map(cx0, cy0, width, height, out_path, tile_px=None, workers=0, edits=None):
+    """
+    Exporte en PNG la région de width x height chunks dont le coin haut gauche est le
+    chunk (cx0, cy0). La région est parcourue par bandes d'une ligne de chunks, découpées
+    en un segment de colonnes par processus (workers processus lancés en mode spawn,
+    sans rien hériter de la fenêtre du jeu, ou dans ce processus si workers = 0).
+    Les lignes d'une bande sont compressées et écrites aussitôt dans des blocs IDAT.
+    Un segment n'est demandé qu'une fois le segment au-dessus reçu (il en reprend la
+    ligne de chunks inférieure, déjà générée) : le rendu a au plus une bande d'avance
+    sur l'écriture, et la mémoire reste bornée par deux bandes quelle que soit la hauteur.
+    edits : modifications du joueur à appliquer (par défaut celles du jeu).
+    """
+    tile_px = tile_px or TS
+    edits = chunk_edits if edits is None else edits
+    chunk_px = CHUNK_TILES * tile_px
+    image_w = width * chunk_px
+    image_h = height * chunk_px
+    init_args = (TS, CHUNK_SIZE, edits, edits_geometry)
+    count = min(width, max(1, workers))
+    bounds = [cx0 + width * i // count for i in range(count + 1)]
+    segments = [(start, end - 1) for start, end in zip(bounds, bounds[1:])]
+    print(f"Export de {width}x{height} chunks ({image_w}x{image_h} pixels, {workers} processus) -> {out_path}")
+    pool = None
+    if workers > 0:
+        pool = multiprocessing.get_context("spawn").Pool(workers, initializer=export_worker_init, initargs=init_args)
+    else:
+        export_worker_init(*init_args)
+    pending = {}
+
+    def submit(band, index, carry):
+        task = (cy0 + band, segments[index][0], segments[index][1], tile_px, carry)
+        if pool is None:
+            pending[band, index] = render_export_band(task)
+        else:
+            pending[band, index] = pool.apply_async(render_export_band, (task,))
+
+    start_time = time.time()
+    last_report = start_time
+    compressor = zlib.compressobj(6)
+    try:
+        with open(out_path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            # 8 bits par canal, RGB, sans entrelacement
+            write_png_chunk(f, b"IHDR", struct.pack(">IIBBBBB", image_w, image_h, 8, 2, 0, 0, 0))
+            idat = bytearray()
+            for index in range(count):
+                submit(0, index, None)
+            for band in range(height):
+                parts = []
+                for index in range(count):
+                    result = pending.pop((band, index))
+                    rows, carry = result if pool is None else result.get()
+                    if band + 1 < height:
+                        submit(band + 1, index, carry)
+                    parts.append((memoryview(rows), (segments[index][1] - segments[index][0] + 1) * chunk_px * 3))
+                for y in range(chunk_px):
+                    # Filtre PNG 0 (aucun) en tête de chaque ligne
+                    idat += compressor.compress(b"\x00")
+                    for rows, row_bytes in parts:
+                        idat += compressor.compress(rows[y * row_bytes:(y + 1) * row_bytes])
+                    if len(idat) >= 1 << 20:
+                        write_png_chunk(f, b"IDAT", bytes(idat))
+                        idat.clear()
+                del parts
+                now = time.time()
+                if now - last_report >= 1.0:
+                    rate = (band + 1) * width / (now - start_time)
+                    print(f"  {band + 1}/{height} bandes - {rate:.0f} chunks/s")
+                    last_report = now
+            idat += compressor.flush()
+            write_png_chunk(f, b"IDAT", bytes(idat))
+            write_png_chunk(f, b"IEND", b"")
+    except KeyboardInterrupt:
+        print("Export interrompu : l'image est incomplète")
+        return 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    elapsed = max(time.time() - start_time, 1e-9)
+    print(f"{width * height} chunks exportés en {elapsed:.1f} s ({width * height / elapsed:.0f} chunks/s, "
+          f"{image_w * image_h / elapsed / 1e6:.1f} Mpixels/s), {os.path.getsize(out_path) / 1e6:.1f} Mo, "
+          f"mémoire max : {peak_memory_text()}")
+    return 0
+
+def start_map_export(cx0, cy0, width, height, out_path, tile_px):
+    """
+    Lance export_map depuis la console sans bloquer le jeu : l'écriture du PNG se fait
+    dans un thread et le rendu des bandes dans des processus séparés. La progression
+    est affichée dans le terminal. Retourne un message pour la console.
+    """
+    global export_thread
+    if export_thread is not None and export_thread.is_alive():
+        return "Erreur: un export est déjà en cours"
+    # Copie : le joueur peut continuer à modifier le monde pendant l'export
+    edits = {key: dict(tiles) for key, tiles in chunk_edits.items()}
+    workers = max(1, (os.cpu_count() or 1) - 1)
+    export_thread = threading.Thread(target=export_map, args=(cx0, cy0, width, height, out_path, tile_px, workers, edits),
+                                     name="ato-export")
+    export_thread.start()
+    return f"Export de {width}x{height} chunks vers {out_path} lancé (progression dans le terminal)"
+
+def wait_map_export():
+    """
+    Attend la fin d'un export lancé depuis la console (à la fermeture du jeu).
+    """
+    if export_thread is not None and export_thread.is_alive():
+        print("Attente de la fin de l'export...")
+        export_thread.join()
 
 def get_tile_at_world(wx, wy):
     """
@@ -401,9 +1571,9 @@ def get_tile_at_world(wx, wy):
     local_y = ((wy % CHUNK_SIZE) + CHUNK_SIZE) % CHUNK_SIZE // TS
     return get_tile_in_chunk(chunk, local_x, local_y)
 
-def draw_grass_tile(sx, sy, wx, wy):
+def draw_grass_tile(sx, sy, wx, wy, surface=None):
     """
-    Dessine une tuile d'herbe à l'écran.
+    Dessine une tuile d'herbe à l'écran (ou sur surface).
     Utilisé pour T_GRASS et comme fond pour T_TREE.
     """
     tx = wx // TS
@@ -412,63 +1582,227 @@ def draw_grass_tile(sx, sy, wx, wy):
     rand = seed % 100
     # Affiche la tuile 38 dans GRASS_TILE_38_FREQUENCY% des cas, sinon une tuile aléatoire parmi les autres
     if rand < GRASS_TILE_38_FREQUENCY and field_38_tile is not None:
-        screen.blit(field_38_tile, (sx, sy))
+        blit_image(field_38_tile, (sx, sy), surface=surface)
     elif len(grass_tiles) > 0:
         grass_index = seed % len(grass_tiles)
-        screen.blit(grass_tiles[grass_index], (sx, sy))
+        blit_image(grass_tiles[grass_index], (sx, sy), surface=surface)
     else:
-        pygame.draw.rect(screen, COLORS['G'], (sx, sy, DISPLAY_TS, DISPLAY_TS))
+        fill_rect(COLORS['G'], (sx, sy, DISPLAY_TS, DISPLAY_TS), surface)
 
-def draw_tile_screen(sx, sy, tile_type, wx=0, wy=0):
+def draw_tile_screen(sx, sy, tile_type, wx=0, wy=0, surface=None):
     """
-    Dessine une tuile à l'écran aux coordonnées écran (sx, sy).
+    Dessine une tuile à l'écran aux coordonnées écran (sx, sy), ou sur surface si elle
+    est donnée (les coordonnées sont alors relatives à surface).
     Utilise un générateur pseudo-aléatoire basé sur les coordonnées monde pour la variété.
     """
     if tile_type == T_GRASS:
         # Affiche une image d'herbe aléatoire ou un rectangle coloré
-        draw_grass_tile(sx, sy, wx, wy)
+        draw_grass_tile(sx, sy, wx, wy, surface)
     elif tile_type == T_PATH:
         # Chemin avec bordure supérieure
-        pygame.draw.rect(screen, COLORS['P'], (sx, sy, DISPLAY_TS, DISPLAY_TS))
-        pygame.draw.rect(screen, COLORS['DD'], (sx, sy, DISPLAY_TS, 4 * DISPLAY_SCALE))
+        fill_rect(COLORS['P'], (sx, sy, DISPLAY_TS, DISPLAY_TS), surface)
+        fill_rect(COLORS['DD'], (sx, sy, DISPLAY_TS, 4 * DISPLAY_SCALE), surface)
     elif tile_type == T_TREE:
-        # Dessine d'abord l'herbe, puis l'arbre par-dessus (superposition)
-        draw_grass_tile(sx, sy, wx, wy)
-        if len(tree_tiles) > 0:
-            tx = wx // TS
-            ty = wy // TS
-            seed = tile_seed(tx, ty)
-            tree_index = seed % len(tree_tiles)
-            screen.blit(tree_tiles[tree_index], (sx, sy))
-        else:
+        # L'herbe seulement : l'arbre est dessiné par le calque de sprites (draw_sprites)
+        draw_grass_tile(sx, sy, wx, wy, surface)
+        if len(tree_sets) == 0:
             # Fallback : dessin simple si pas d'images chargées
-            pygame.draw.rect(screen, COLORS['TT'], (sx + 6 * DISPLAY_SCALE, sy, 16 * DISPLAY_SCALE, 16 * DISPLAY_SCALE))
-            pygame.draw.rect(screen, COLORS['TR'], (sx + 12 * DISPLAY_SCALE, sy + 16 * DISPLAY_SCALE, 4 * DISPLAY_SCALE, 8 * DISPLAY_SCALE))
+            fill_rect(COLORS['TT'], (sx + 6 * DISPLAY_SCALE, sy, 16 * DISPLAY_SCALE, 16 * DISPLAY_SCALE), surface)
+            fill_rect(COLORS['TR'], (sx + 12 * DISPLAY_SCALE, sy + 16 * DISPLAY_SCALE, 4 * DISPLAY_SCALE, 8 * DISPLAY_SCALE), surface)
     elif tile_type == T_HOUSE:
         # Maison : murs, toit rouge et porte
-        pygame.draw.rect(screen, COLORS['G'], (sx, sy, DISPLAY_TS, DISPLAY_TS))
-        pygame.draw.rect(screen, COLORS['W'], (sx + 3 * DISPLAY_SCALE, sy + 10 * DISPLAY_SCALE, 22 * DISPLAY_SCALE, 16 * DISPLAY_SCALE))
+        fill_rect(COLORS['G'], (sx, sy, DISPLAY_TS, DISPLAY_TS), surface)
+        fill_rect(COLORS['W'], (sx + 3 * DISPLAY_SCALE, sy + 10 * DISPLAY_SCALE, 22 * DISPLAY_SCALE, 16 * DISPLAY_SCALE), surface)
         # Planches verticales sur les murs
         for i in range(0, 22, 7):
-            pygame.draw.rect(screen, COLORS['WD'], (sx + (3 + i) * DISPLAY_SCALE, sy + 10 * DISPLAY_SCALE, 2 * DISPLAY_SCALE, 16 * DISPLAY_SCALE))
-        pygame.draw.rect(screen, COLORS['R'], (sx, sy + 6 * DISPLAY_SCALE, 28 * DISPLAY_SCALE, 6 * DISPLAY_SCALE))
-        pygame.draw.rect(screen, COLORS['D'], (sx + 11 * DISPLAY_SCALE, sy + 20 * DISPLAY_SCALE, 6 * DISPLAY_SCALE, 6 * DISPLAY_SCALE))
+            fill_rect(COLORS['WD'], (sx + (3 + i) * DISPLAY_SCALE, sy + 10 * DISPLAY_SCALE, 2 * DISPLAY_SCALE, 16 * DISPLAY_SCALE), surface)
+        fill_rect(COLORS['R'], (sx, sy + 6 * DISPLAY_SCALE, 28 * DISPLAY_SCALE, 6 * DISPLAY_SCALE), surface)
+        fill_rect(COLORS['D'], (sx + 11 * DISPLAY_SCALE, sy + 20 * DISPLAY_SCALE, 6 * DISPLAY_SCALE, 6 * DISPLAY_SCALE), surface)
     elif tile_type == T_BORDER:
         # Bordure avec motif alterné bleu/blanc
         cx, cy = get_chunk_coords(wx, wy)
         if cx == 0 or cy == 0:
             color_idx = (wx + wy) % (BORDER_SIZE * 2)
             color = COLORS['BLUE'] if color_idx < BORDER_SIZE else COLORS['WH']
-            pygame.draw.rect(screen, color, (sx, sy, DISPLAY_TS, DISPLAY_TS))
+            fill_rect(color, (sx, sy, DISPLAY_TS, DISPLAY_TS), surface)
         else:
-            pygame.draw.rect(screen, COLORS['G'], (sx, sy, DISPLAY_TS, DISPLAY_TS))
+            fill_rect(COLORS['G'], (sx, sy, DISPLAY_TS, DISPLAY_TS), surface)
+
+def build_chunk_sprites(key, chunk):
+    """
+    Construit la liste des sprites d'arbres d'un chunk, triée par profondeur.
+    Chaque arbre est tiré du jeu d'arbres de son biome.
+    Un sprite est un tuple (base_y, centre_x, demi_largeur, hauteur, image, ombre,
+    décalage de l'ombre) en coordonnées monde : base_y est le bas de la tuile, où se
+    trouve le pied de l'arbre. L'ombre recadrée se place au coin haut gauche de l'image
+    plus son décalage (en pixels écran).
+    """
+    sprites = []
+    if len(tree_sets) == 0:
+        return sprites
+    cx, cy = key
+    biomes = get_chunk_biomes(cx, cy)
+    default_set = tree_sets.get("Tree") or next(iter(tree_sets.values()))
+    for ty in range(CHUNK_TILES):
+        row = ty * CHUNK_TILES
+        for tx in range(CHUNK_TILES):
+            if chunk[row + tx] == T_TREE:
+                # Coordonnées de la tuile dans le monde
+                wtx = cx * CHUNK_TILES + tx
+                wty = cy * CHUNK_TILES + ty
+                trees = tree_sets.get(BIOMES[biomes[row + tx]][1], default_set)
+                tree, shadow, shadow_offset = trees[tile_seed(wtx, wty) % len(trees)]
+                sprites.append((wty * TS + TS, wtx * TS + TS // 2,
+                                tree.get_width() // (2 * DISPLAY_SCALE), tree.get_height() // DISPLAY_SCALE,
+                                tree, shadow, shadow_offset))
+    # Le parcours ligne par ligne donne déjà l'ordre (base_y, centre_x)
+    return sprites
+
+def update_visible_sprites(cam_x, cam_y):
+    """
+    Met à jour la liste des sprites visibles, triée par profondeur.
+    Seuls les chunks du hash spatial qui touchent la vue (élargie du débordement
+    maximal d'un arbre) sont parcourus. Le tri est incrémental : les sprites encore
+    visibles gardent l'ordre de l'image précédente et les nouveaux y sont fusionnés.
+    """
+    global visible_sprites
+    if tree_sprites_ts != DISPLAY_TS:
+        load_tree_sprites()
+    view_w = HALF_W // DISPLAY_SCALE + TS
+    view_h = HALF_H // DISPLAY_SCALE + TS
+    left, right = cam_x - view_w, cam_x + view_w
+    top, bottom = cam_y - view_h, cam_y + view_h
+    start_cx, start_cy = get_chunk_coords(left - tree_sprite_reach, top)
+    end_cx, end_cy = get_chunk_coords(right + tree_sprite_reach, bottom + tree_sprite_reach)
+    candidates = set()
+    for cy in range(start_cy, end_cy + 1):
+        for cx in range(start_cx, end_cx + 1):
+            key = get_chunk_key(cx, cy)
+            sprites = chunk_sprites.get(key)
+            if sprites is None:
+                chunk = chunks_loaded.get(key)
+                if chunk is None:
+                    continue
+                sprites = build_chunk_sprites(key, chunk)
+                chunk_sprites[key] = sprites
+            for sprite in sprites:
+                base_y, center_x, half_w, height = sprite[:4]
+                if base_y > top and base_y - height < bottom and center_x + half_w > left and center_x - half_w < right:
+                    candidates.add(sprite)
+    kept = [sprite for sprite in visible_sprites if sprite in candidates]
+    candidates.difference_update(kept)
+    visible_sprites = list(heapq.merge(kept, sorted(candidates)))
+
+def draw_sprites(cam_x, cam_y, front):
+    """
+    Dessine les sprites visibles (arbres et entités) par passes groupées (blit_batch).
+    Avec front=False : toutes les ombres, puis les sprites situés derrière le joueur.
+    Avec front=True : les sprites situés devant le joueur (à dessiner après lui).
+    """
+    player_base_y = cam_y + PS // (2 * DISPLAY_SCALE)
+    if not front:
+        # Les ombres sont au sol : une seule passe, sous tous les arbres
+        shadows = []
+        for base_y, center_x, half_w, height, tree, shadow, (dx, dy) in visible_sprites:
+            if shadow is not None:
+                sx = (center_x - cam_x) * DISPLAY_SCALE + HALF_W - tree.get_width() // 2 + dx
+                sy = (base_y - cam_y) * DISPLAY_SCALE + HALF_H - tree.get_height() + dy
+                shadows.append((shadow, (sx, sy)))
+        blit_batch(shadows)
+    trees = []
+    for base_y, center_x, half_w, height, tree, shadow, shadow_offset in visible_sprites:
+        if (base_y > player_base_y) == front:
+            sx = (center_x - cam_x) * DISPLAY_SCALE + HALF_W - tree.get_width() // 2
+            sy = (base_y - cam_y) * DISPLAY_SCALE + HALF_H - tree.get_height()
+            trees.append((base_y, (tree, (sx, sy))))
+    entities = [item for item in visible_entities if (item[0] > player_base_y) == front]
+    # Les deux listes sont triées par profondeur : une fusion suffit
+    blits = [blit for _, blit in heapq.merge(trees, entities, key=lambda item: item[0])]
+    blit_batch(blits)
+
+def peek_tile_at_world(wx, wy):
+    """
+    Comme get_tile_at_world, sans jamais charger ni générer de chunk :
+    retourne None si le chunk n'est pas en mémoire. Utilisable depuis les threads de rendu.
+    """
+    cx, cy = get_chunk_coords(wx, wy)
+    chunk = chunks_loaded.get(get_chunk_key(cx, cy))
+    return get_tile_in_chunk(chunk, (wx - cx * CHUNK_SIZE) // TS, (wy - cy * CHUNK_SIZE) // TS)
+
+def draw_ground_strip(cam_x, cam_y, top, bottom, surface=None):
+    """
+    Dessine les tuiles du sol qui touchent les lignes écran [top, bottom).
+    Sans surface, dessine sur le backend actif ; sinon surface est la sous-surface de
+    l'écran qui commence à la ligne top (une bande du rendu multithread).
+    Ne fait que lire les chunks déjà chargés : aucune structure partagée n'est modifiée.
+    """
+    offset_y = top if surface is not None else 0
+    start_tx = (cam_x - HALF_W // DISPLAY_SCALE) // TS - 1
+    end_tx = (cam_x + HALF_W // DISPLAY_SCALE) // TS + 2
+    start_ty = (cam_y + (top - HALF_H) // DISPLAY_SCALE) // TS - 1
+    end_ty = (cam_y + (bottom - HALF_H) // DISPLAY_SCALE) // TS + 2
+    for ty in range(start_ty, end_ty):
+        wy = ty * TS
+        sy = (wy - cam_y) * DISPLAY_SCALE + HALF_H
+        if top - DISPLAY_TS < sy < bottom:
+            for tx in range(start_tx, end_tx):
+                wx = tx * TS
+                sx = (wx - cam_x) * DISPLAY_SCALE + HALF_W
+                if -DISPLAY_TS < sx < SCREEN_W:
+                    tile = peek_tile_at_world(wx, wy)
+                    if tile is not None:
+                        draw_tile_screen(sx, sy - offset_y, tile, wx, wy, surface)
+                    else:
+                        fill_rect(COLORS['BL'], (sx, sy - offset_y, DISPLAY_TS, DISPLAY_TS), surface)
+
+def get_render_pool():
+    """
+    Retourne le pool de threads du rendu par bandes, recréé si RENDER_THREADS a changé.
+    """
+    global render_pool, render_pool_threads
+    if render_pool is None or render_pool_threads != RENDER_THREADS:
+        shutdown_render_pool()
+        render_pool = ThreadPoolExecutor(max_workers=RENDER_THREADS, thread_name_prefix="ato-render")
+        render_pool_threads = RENDER_THREADS
+    return render_pool
+
+def shutdown_render_pool():
+    """
+    Arrête les threads de rendu.
+    """
+    global render_pool, render_pool_threads
+    if render_pool is not None:
+        render_pool.shutdown()
+        render_pool = None
+        render_pool_threads = 0
+
+def draw_ground(cam_x, cam_y):
+    """
+    Dessine le sol visible. Si RENDER_THREADS > 0 (backend surface uniquement), l'écran
+    est découpé en bandes horizontales (sous-surfaces) dessinées en parallèle : les blits
+    et remplissages de pygame relâchent le GIL. Toutes les bandes sont terminées au retour.
+    """
+    if RENDER_THREADS <= 0 or renderer is not None:
+        draw_ground_strip(cam_x, cam_y, 0, SCREEN_H)
+        return
+    pool = get_render_pool()
+    width, height = screen.get_size()
+    strips = RENDER_THREADS * RENDER_STRIPS_PER_THREAD
+    bounds = [height * i // strips for i in range(strips + 1)]
+    jobs = [pool.submit(draw_ground_strip, cam_x, cam_y, top, bottom,
+                        screen.subsurface((0, top, width, bottom - top)))
+            for top, bottom in zip(bounds, bounds[1:]) if bottom > top]
+    for job in jobs:
+        job.result()
 
 def draw_world(cam_x, cam_y):
     """
-    Dessine le monde visible autour de la caméra.
+    Dessine le monde visible autour de la caméra : le sol, puis les ombres et les
+    arbres situés derrière le joueur. La caméra est au centre de l'écran.
     Charge les chunks nécessaires et décharge ceux trop éloignés.
     """
-    screen.fill(COLORS['BL'])
+    clear_screen(COLORS['BL'])
+    poll_world_service()
     cam_cx = cam_x // CHUNK_SIZE
     cam_cy = cam_y // CHUNK_SIZE
     # Charge les chunks dans un rayon de 2 autour de la caméra
@@ -476,78 +1810,306 @@ def draw_world(cam_x, cam_y):
         for cx in range(cam_cx - 2, cam_cx + 3):
             load_chunk(cx, cy)
     unload_distant_chunks(cam_x, cam_y)
-    # Calcule la zone visible en tuiles
-    start_tx = (cam_x - HALF_W) // TS - 1
-    start_ty = (cam_y - HALF_H) // TS - 1
-    end_tx = (cam_x + HALF_W) // TS + 2
-    end_ty = (cam_y + HALF_H) // TS + 2
-    # Dessine toutes les tuiles visibles
-    for ty in range(start_ty, end_ty):
-        wy = ty * TS
-        sy = (wy - cam_y + HALF_H) * DISPLAY_SCALE
-        if -DISPLAY_TS <= sy < SCREEN_H + DISPLAY_TS:
-            for tx in range(start_tx, end_tx):
-                wx = tx * TS
-                sx = (wx - cam_x + HALF_W) * DISPLAY_SCALE
-                if -DISPLAY_TS <= sx < SCREEN_W + DISPLAY_TS:
-                    tile = get_tile_at_world(wx, wy)
-                    if tile is not None:
-                        draw_tile_screen(sx, sy, tile, wx, wy)
-                    else:
-                        pygame.draw.rect(screen, COLORS['BL'], (sx, sy, DISPLAY_TS, DISPLAY_TS))
+    # Charge aussi les chunks visibles au-delà (grandes fenêtres) : le dessin du sol ne fait que les lire
+    start_cx, start_cy = get_chunk_coords(cam_x - HALF_W // DISPLAY_SCALE - TS, cam_y - HALF_H // DISPLAY_SCALE - TS)
+    end_cx, end_cy = get_chunk_coords(cam_x + HALF_W // DISPLAY_SCALE + TS, cam_y + HALF_H // DISPLAY_SCALE + TS)
+    for cy in range(start_cy, end_cy + 1):
+        for cx in range(start_cx, end_cx + 1):
+            if get_chunk_key(cx, cy) not in chunks_loaded:
+                load_chunk(cx, cy)
+    draw_ground(cam_x, cam_y)
+    update_visible_sprites(cam_x, cam_y)
+    update_visible_entities(cam_x, cam_y)
+    draw_sprites(cam_x, cam_y, front=False)
 
-def draw_player(frame=0):
+def draw_scene(cam_x, cam_y, frame):
     """
-    Dessine le joueur (slime) au centre de l'écran avec animation de saut.
+    Dessine le monde, le joueur, puis les arbres qui passent devant lui.
+    """
+    draw_world(cam_x, cam_y)
+    draw_player(frame)
+    draw_sprites(cam_x, cam_y, front=True)
+
+def get_anim_sheet(name, draw_frame, frame_w, frame_h, frame_count=ANIM_FRAMES):
+    """
+    Retourne la planche d'animation `name` : (paramètres de validité, planche, largeur, hauteur).
+    Chaque image est dessinée une seule fois par draw_frame(surface, x, y, frame), côte à côte
+    sur une même surface ; l'affichage se fait ensuite avec un seul blit (voir draw_anim_frame).
+    La planche est reconstruite si DISPLAY_SCALE ou PS ont changé.
+    Utilisable pour toute entité dessinée de manière procédurale.
+    """
+    validity = (DISPLAY_SCALE, PS, frame_w, frame_h, frame_count)
+    entry = anim_sheets.get(name)
+    if entry is None or entry[0] != validity:
+        sheet = pygame.Surface((frame_w * frame_count, frame_h), pygame.SRCALPHA)
+        for frame in range(frame_count):
+            draw_frame(sheet, frame * frame_w, 0, frame)
+        if pygame.display.get_surface() is not None:
+            sheet = sheet.convert_alpha()
+        entry = (validity, sheet, frame_w, frame_h)
+        anim_sheets[name] = entry
+    return entry
+
+def invalidate_anim_cache():
+    """
+    Vide le cache des planches d'animation (après un changement de PS ou d'échelle).
+    """
+    anim_sheets.clear()
+    texture_cache.clear()
+
+def draw_anim_frame(sheet_entry, frame, x, y):
+    """
+    Dessine l'image `frame` d'une planche d'animation à la position écran (x, y).
+    """
+    _, sheet, frame_w, frame_h = sheet_entry
+    blit_image(sheet, (x, y), (frame * frame_w, 0, frame_w, frame_h))
+
+def draw_slime_frame(surface, x, y, frame):
+    """
+    Dessine une image de l'animation de saut du slime avec son coin en (x, y).
     Le paramètre frame contrôle l'animation (0-19).
-    Le joueur garde sa taille initiale (28 pixels) même si les tuiles sont agrandies.
     """
-    sx = HALF_W - PS // 2
-    sy = HALF_H - PS // 2
     # Calcul de l'animation de saut (effet de squash/stretch)
     progress = frame / 20.0
     squash = int(3 * abs(0.5 - progress) * 2)  # Compression verticale
     wave_x = int(2 * abs(0.5 - progress))  # Déplacement horizontal de l'œil
     eye_y_offset = int(1 * abs(0.5 - progress))  # Déplacement vertical de l'œil
     # Corps principal du slime
-    pygame.draw.rect(screen, COLORS['SLIME'], (sx + 4, sy + 4 + squash, 20, 16 - squash * 2))
-    pygame.draw.rect(screen, COLORS['SLIME'], (sx + 5, sy + 5 + squash, 18, 14 - squash * 2))
+    pygame.draw.rect(surface, COLORS['SLIME'], (x + 4, y + 4 + squash, 20, 16 - squash * 2))
+    pygame.draw.rect(surface, COLORS['SLIME'], (x + 5, y + 5 + squash, 18, 14 - squash * 2))
     # Reflets clairs
-    pygame.draw.rect(screen, COLORS['SLIME_L'], (sx + 6, sy + 6 + squash, 16, 12 - squash * 2))
-    pygame.draw.rect(screen, COLORS['SLIME_L'], (sx + 6, sy + 5 + squash, 8, 7))
-    pygame.draw.rect(screen, COLORS['SLIME_L'], (sx + 8, sy + 6 + squash, 6, 6))
+    pygame.draw.rect(surface, COLORS['SLIME_L'], (x + 6, y + 6 + squash, 16, 12 - squash * 2))
+    pygame.draw.rect(surface, COLORS['SLIME_L'], (x + 6, y + 5 + squash, 8, 7))
+    pygame.draw.rect(surface, COLORS['SLIME_L'], (x + 8, y + 6 + squash, 6, 6))
     # Œil
-    pygame.draw.rect(screen, COLORS['WH'], (sx + 11 + wave_x, sy + 8 + squash + eye_y_offset, 2, 3))
+    pygame.draw.rect(surface, COLORS['WH'], (x + 11 + wave_x, y + 8 + squash + eye_y_offset, 2, 3))
     # Ombre en bas
-    pygame.draw.rect(screen, COLORS['SLIME_D'], (sx + 5, sy + 18 - squash, 18, 3))
-    pygame.draw.rect(screen, COLORS['SLIME_D'], (sx + 6, sy + 20 - squash, 16, 2))
+    pygame.draw.rect(surface, COLORS['SLIME_D'], (x + 5, y + 18 - squash, 18, 3))
+    pygame.draw.rect(surface, COLORS['SLIME_D'], (x + 6, y + 20 - squash, 16, 2))
     # Petites bulles sur les côtés
-    pygame.draw.rect(screen, COLORS['SLIME'], (sx + 2, sy + 6 + squash, 2, 3))
-    pygame.draw.rect(screen, COLORS['SLIME'], (sx + 24, sy + 6 + squash, 2, 3))
-    pygame.draw.rect(screen, COLORS['SLIME'], (sx + 4, sy + 5 + squash, 2, 2))
-    pygame.draw.rect(screen, COLORS['SLIME'], (sx + 22, sy + 5 + squash, 2, 2))
+    pygame.draw.rect(surface, COLORS['SLIME'], (x + 2, y + 6 + squash, 2, 3))
+    pygame.draw.rect(surface, COLORS['SLIME'], (x + 24, y + 6 + squash, 2, 3))
+    pygame.draw.rect(surface, COLORS['SLIME'], (x + 4, y + 5 + squash, 2, 2))
+    pygame.draw.rect(surface, COLORS['SLIME'], (x + 22, y + 5 + squash, 2, 2))
+
+def draw_player(frame=0):
+    """
+    Dessine le joueur (slime) au centre de l'écran avec animation de saut.
+    Le paramètre frame contrôle l'animation (0-19).
+    Le joueur garde sa taille initiale (28 pixels) même si les tuiles sont agrandies.
+    """
+    sheet = get_anim_sheet('slime', draw_slime_frame, SLIME_SIZE, SLIME_SIZE)
+    draw_anim_frame(sheet, frame, HALF_W - PS // 2, HALF_H - PS // 2)
+
+def allocate_entity_block():
+    """
+    Retourne un bloc d'entités libre (tous ses emplacements inoccupés), en recyclant
+    un bloc libéré ou, sinon, en agrandissant les tableaux (capacité doublée).
+    """
+    global ent_x, ent_y, ent_vx, ent_vy, ent_frame, ent_timer, ent_alive
+    if entity_free_blocks:
+        return entity_free_blocks.pop()
+    blocks = len(ent_alive) // ENTITY_BLOCK
+    grow = max(blocks, 16) * ENTITY_BLOCK
+    ent_x = np.concatenate((ent_x, np.zeros(grow, np.float32)))
+    ent_y = np.concatenate((ent_y, np.zeros(grow, np.float32)))
+    ent_vx = np.concatenate((ent_vx, np.zeros(grow, np.float32)))
+    ent_vy = np.concatenate((ent_vy, np.zeros(grow, np.float32)))
+    ent_frame = np.concatenate((ent_frame, np.zeros(grow, np.uint8)))
+    ent_timer = np.concatenate((ent_timer, np.zeros(grow, np.int16)))
+    ent_alive = np.concatenate((ent_alive, np.zeros(grow, np.bool_)))
+    entity_free_blocks.extend(range(len(ent_alive) // ENTITY_BLOCK - 1, blocks, -1))
+    return blocks
+
+def spawn_chunk_entities(key, chunk):
+    """
+    Place les slimes errants d'un chunk chargé pour la première fois (ou dont les
+    entités ont été recyclées), sur des tuiles d'herbe choisies de manière déterministe.
+    """
+    cx, cy = key
+    block = allocate_entity_block()
+    entity_blocks[key] = block
+    i = block * ENTITY_BLOCK
+    for n in range(NPC_PER_CHUNK):
+        seed = get_seed(n, NPC_PER_CHUNK, cx, cy)
+        tx = seed % CHUNK_TILES
+        ty = (seed // CHUNK_TILES) % CHUNK_TILES
+        if chunk[ty * CHUNK_TILES + tx] != T_GRASS:
+            continue
+        ent_x[i] = cx * CHUNK_SIZE + tx * TS + TS / 2
+        ent_y[i] = cy * CHUNK_SIZE + ty * TS + TS / 2
+        ent_vx[i] = 0.0
+        ent_vy[i] = 0.0
+        ent_frame[i] = seed % ANIM_FRAMES
+        ent_timer[i] = 0
+        ent_alive[i] = True
+        i += 1
+
+def free_entity_block(key):
+    """
+    Libère le bloc d'entités d'un chunk : ses emplacements seront réutilisés.
+    """
+    block = entity_blocks.pop(key)
+    ent_alive[block * ENTITY_BLOCK:(block + 1) * ENTITY_BLOCK] = False
+    entity_free_blocks.append(block)
+
+def suspend_chunk_entities(key):
+    """
+    Suspend les entités d'un chunk déchargé : elles ne bougent plus jusqu'à son
+    rechargement. Au-delà de MAX_SUSPENDED_ENTITY_CHUNKS chunks suspendus, les
+    entités du plus ancien sont recyclées (elles seront replacées s'il revient).
+    """
+    if key not in entity_blocks:
+        return
+    suspended_entity_chunks[key] = None
+    while len(suspended_entity_chunks) > MAX_SUSPENDED_ENTITY_CHUNKS:
+        oldest = next(iter(suspended_entity_chunks))
+        del suspended_entity_chunks[oldest]
+        free_entity_block(oldest)
+
+def clear_entities():
+    """
+    Oublie toutes les entités (par exemple quand la géométrie des chunks change).
+    """
+    for key in list(entity_blocks):
+        free_entity_block(key)
+    suspended_entity_chunks.clear()
+
+def update_entities(advance_anim):
+    """
+    Fait avancer les entités des chunks chargés. Les blocs de ces chunks sont mis à
+    jour ensemble par opérations sur les tableaux ; seules les rares entités qui
+    changent de tuile sont vérifiées une à une (tuile bloquante, chunk non chargé ou
+    plein : demi-tour) et celles qui changent de chunk sont déplacées dans son bloc.
+    Les entités des chunks déchargés sont suspendues.
+    Retourne le nombre d'entités actives.
+    """
+    rows = np.fromiter((entity_blocks[key] for key in chunks_loaded if key in entity_blocks), dtype=np.intp)
+    if len(rows) == 0:
+        return 0
+    shape = (-1, ENTITY_BLOCK)
+    alive = ent_alive.reshape(shape)[rows]
+    x = ent_x.reshape(shape)[rows]
+    y = ent_y.reshape(shape)[rows]
+    vx = ent_vx.reshape(shape)[rows]
+    vy = ent_vy.reshape(shape)[rows]
+    timer = ent_timer.reshape(shape)[rows]
+    # Nouvelle direction (ou pause) pour une durée aléatoire quand le minuteur expire
+    expired = alive & (timer == 0)
+    count = int(expired.sum())
+    if count:
+        vx[expired] = entity_rng.integers(-1, 2, count) * NPC_SPEED
+        vy[expired] = entity_rng.integers(-1, 2, count) * NPC_SPEED
+        timer[expired] = entity_rng.integers(30, 151, count)
+    timer[alive & ~expired] -= 1
+    nx = x + vx
+    ny = y + vy
+    old_tx = np.floor_divide(x, TS).astype(np.int64)
+    old_ty = np.floor_divide(y, TS).astype(np.int64)
+    new_tx = np.floor_divide(nx, TS).astype(np.int64)
+    new_ty = np.floor_divide(ny, TS).astype(np.int64)
+    blocked = np.zeros(alive.shape, np.bool_)
+    moves = []
+    for r, c in zip(*np.nonzero(alive & ((new_tx != old_tx) | (new_ty != old_ty)))):
+        wtx, wty = int(new_tx[r, c]), int(new_ty[r, c])
+        key = (wtx // CHUNK_TILES, wty // CHUNK_TILES)
+        old_key = (int(old_tx[r, c]) // CHUNK_TILES, int(old_ty[r, c]) // CHUNK_TILES)
+        if (key != old_key and key not in chunks_loaded) or is_blocked_tile(wtx, wty):
+            blocked[r, c] = True
+        elif key != old_key:
+            moves.append((int(rows[r]) * ENTITY_BLOCK + int(c), entity_blocks[key]))
+    moving = alive & ~blocked
+    x[moving] = nx[moving]
+    y[moving] = ny[moving]
+    vx[blocked] = -vx[blocked]
+    vy[blocked] = -vy[blocked]
+    ent_x.reshape(shape)[rows] = x
+    ent_y.reshape(shape)[rows] = y
+    ent_vx.reshape(shape)[rows] = vx
+    ent_vy.reshape(shape)[rows] = vy
+    ent_timer.reshape(shape)[rows] = timer
+    if advance_anim:
+        frame = ent_frame.reshape(shape)[rows]
+        frame[alive] = (frame[alive] + 1) % ANIM_FRAMES
+        ent_frame.reshape(shape)[rows] = frame
+    for i, block in moves:
+        free = np.flatnonzero(~ent_alive[block * ENTITY_BLOCK:(block + 1) * ENTITY_BLOCK])
+        if len(free) == 0:
+            # Chunk d'arrivée plein : l'entité revient sur ses pas
+            ent_x[i] -= ent_vx[i]
+            ent_y[i] -= ent_vy[i]
+            ent_vx[i] = -ent_vx[i]
+            ent_vy[i] = -ent_vy[i]
+            continue
+        j = block * ENTITY_BLOCK + int(free[0])
+        for field in (ent_x, ent_y, ent_vx, ent_vy, ent_frame, ent_timer):
+            field[j] = field[i]
+        ent_alive[j] = True
+        ent_alive[i] = False
+    return int(alive.sum())
+
+def update_visible_entities(cam_x, cam_y):
+    """
+    Prépare les blits des entités visibles, triés par profondeur.
+    Seuls les blocs des chunks qui touchent la vue sont examinés.
+    Retourne True si ces blits ont changé (entité visible déplacée à l'écran ou
+    changée d'image, entrée ou sortie de la vue).
+    """
+    global visible_entities
+    previous = visible_entities
+    sheet_entry = get_anim_sheet('slime', draw_slime_frame, SLIME_SIZE, SLIME_SIZE)
+    _, sheet, frame_w, frame_h = sheet_entry
+    half_w = frame_w / (2 * DISPLAY_SCALE)
+    half_h = frame_h / (2 * DISPLAY_SCALE)
+    left = cam_x - HALF_W // DISPLAY_SCALE - half_w
+    right = cam_x + HALF_W // DISPLAY_SCALE + half_w
+    top = cam_y - HALF_H // DISPLAY_SCALE - half_h
+    bottom = cam_y + HALF_H // DISPLAY_SCALE + half_h
+    start_cx, start_cy = get_chunk_coords(int(left), int(top))
+    end_cx, end_cy = get_chunk_coords(int(right), int(bottom))
+    visible_entities = []
+    blocks = [entity_blocks[(cx, cy)] for cy in range(start_cy, end_cy + 1) for cx in range(start_cx, end_cx + 1)
+              if (cx, cy) in entity_blocks]
+    if not blocks:
+        return bool(previous)
+    indices = (np.array(blocks, np.intp)[:, None] * ENTITY_BLOCK + np.arange(ENTITY_BLOCK)).ravel()
+    x = ent_x[indices]
+    y = ent_y[indices]
+    shown = ent_alive[indices] & (x > left) & (x < right) & (y > top) & (y < bottom)
+    shown = np.flatnonzero(shown)
+    shown = shown[np.argsort(y[shown], kind='stable')]
+    sxs = ((x[shown] - cam_x) * DISPLAY_SCALE).astype(np.int64) + (HALF_W - frame_w // 2)
+    sys_ = ((y[shown] - cam_y) * DISPLAY_SCALE).astype(np.int64) + (HALF_H - frame_h // 2)
+    frames = ent_frame[indices[shown]].astype(np.int64) * frame_w
+    for base_y, sx, sy, fx in zip((y[shown] + half_h).tolist(), sxs.tolist(), sys_.tolist(), frames.tolist()):
+        visible_entities.append((base_y, (sheet, (sx, sy), (fx, 0, frame_w, frame_h))))
+    return visible_entities != previous
 
 def handle_input(wx, wy, keys):
     """
-    Gère les entrées clavier pour déplacer le joueur.
-    Retourne les nouvelles coordonnées monde et un booléen indiquant si le joueur a bougé.
+    Gère les entrées clavier pour déplacer le joueur, en tenant compte des obstacles.
+    Retourne les nouvelles coordonnées monde et un booléen indiquant si une touche
+    de déplacement est enfoncée.
     """
-    new_x, new_y, moved = wx, wy, False
+    dx, dy, moved = 0, 0, False
     # Déplacement vertical
     if keys[pygame.K_UP] or keys[pygame.K_w]:
-        new_y -= SPD
+        dy = -SPD
         moved = True
     elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-        new_y += SPD
+        dy = SPD
         moved = True
     # Déplacement horizontal
     if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-        new_x -= SPD
+        dx = -SPD
         moved = True
     elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-        new_x += SPD
+        dx = SPD
         moved = True
-    return new_x, new_y, moved
+    if not moved:
+        return wx, wy, False
+    new_x, new_y = move_with_collision(wx, wy, dx, dy)
+    return new_x, new_y, True
 
 def draw_fps(fps):
     """
@@ -556,8 +2118,8 @@ def draw_fps(fps):
     fps_text = font.render(f"FPS: {fps}", True, COLORS['WH'])
     text_rect = fps_text.get_rect(topright=(SCREEN_W - 5, 5))
     # Fond noir pour la lisibilité
-    pygame.draw.rect(screen, COLORS['BL'], (text_rect.x - 2, text_rect.y - 2, text_rect.width + 4, text_rect.height + 4))
-    screen.blit(fps_text, text_rect)
+    fill_rect(COLORS['BL'], (text_rect.x - 2, text_rect.y - 2, text_rect.width + 4, text_rect.height + 4))
+    blit_image(fps_text, text_rect.topleft, cache=False)
 
 def draw_menu():
     """
@@ -570,7 +2132,7 @@ def draw_menu():
     start_text = font.render("Appuyez sur ESPACE pour commencer", True, COLORS['WH'])
     start_rect = start_text.get_rect(center=(SCREEN_W // 2, SCREEN_H // 2 + 20))
     screen.blit(start_text, start_rect)
-    controls_text = font.render("Fleches/WASD: Deplacer | ESC: Pause", True, COLORS['WH'])
+    controls_text = font.render("Fleches/WASD/Clic: Deplacer | Clic droit: Couper/Chemin | ESC: Pause", True, COLORS['WH'])
     controls_rect = controls_text.get_rect(center=(SCREEN_W // 2, SCREEN_H // 2 + 50))
     screen.blit(controls_text, controls_rect)
 
@@ -599,7 +2161,7 @@ def set_game_variable(var_name, value_str, anim_speed_ref=None):
     anim_speed_ref est une référence à la variable anim_speed locale.
     """
     global SCREEN_W, SCREEN_H, HALF_W, HALF_H, TS, DISPLAY_SCALE, DISPLAY_TS
-    global CHUNK_SIZE, CHUNK_TILES, PS, SPD, BORDER_SIZE, MAX_CHUNKS_LOADED
+    global CHUNK_SIZE, CHUNK_TILES, PS, SPD, BORDER_SIZE, MAX_CHUNKS_LOADED, RENDER_THREADS
     
     # Dictionnaire des variables modifiables
     variables = {
@@ -612,6 +2174,7 @@ def set_game_variable(var_name, value_str, anim_speed_ref=None):
         'SPD': SPD,
         'BORDER_SIZE': BORDER_SIZE,
         'MAX_CHUNKS_LOADED': MAX_CHUNKS_LOADED,
+        'RENDER_THREADS': RENDER_THREADS,
     }
     if anim_speed_ref is not None:
         variables['anim_speed'] = anim_speed_ref[0]
@@ -639,20 +2202,26 @@ def set_game_variable(var_name, value_str, anim_speed_ref=None):
         TS = int(value)
         DISPLAY_TS = TS * DISPLAY_SCALE
         CHUNK_TILES = CHUNK_SIZE // TS
+        restart_world_service()
     elif var_name == 'DISPLAY_SCALE':
         DISPLAY_SCALE = int(value)
         DISPLAY_TS = TS * DISPLAY_SCALE
+        invalidate_anim_cache()
     elif var_name == 'CHUNK_SIZE':
         CHUNK_SIZE = int(value)
         CHUNK_TILES = CHUNK_SIZE // TS
+        restart_world_service()
     elif var_name == 'PS':
         PS = int(value)
+        invalidate_anim_cache()
     elif var_name == 'SPD':
         SPD = int(value)
     elif var_name == 'BORDER_SIZE':
         BORDER_SIZE = int(value)
     elif var_name == 'MAX_CHUNKS_LOADED':
         MAX_CHUNKS_LOADED = int(value)
+    elif var_name == 'RENDER_THREADS':
+        RENDER_THREADS = max(0, int(value))
     elif var_name == 'anim_speed':
         if anim_speed_ref is not None:
             anim_speed_ref[0] = float(value)
@@ -683,6 +2252,7 @@ def get_variables_list(anim_speed_ref=None):
             f"  SPD = {SPD}\n"
             f"  BORDER_SIZE = {BORDER_SIZE}\n"
             f"  MAX_CHUNKS_LOADED = {MAX_CHUNKS_LOADED}\n"
+            f"  RENDER_THREADS = {RENDER_THREADS}\n"
             f"  anim_speed = {anim_speed_val}")
 
 def execute_command(command, console_history, anim_speed_ref=None):
@@ -701,7 +2271,7 @@ def execute_command(command, console_history, anim_speed_ref=None):
     if cmd == "var":
         if len(parts) >= 2 and parts[1] == "-h":
             # Afficher l'aide pour var
-            return "Variables modifiables:\n  SCREEN_W - Largeur de l'écran\n  SCREEN_H - Hauteur de l'écran\n  TS - Taille des tuiles\n  DISPLAY_SCALE - Facteur d'échelle (2x, 3x, etc.)\n  CHUNK_SIZE - Taille des chunks\n  PS - Taille du joueur\n  SPD - Vitesse de déplacement\n  BORDER_SIZE - Taille de la bordure\n  MAX_CHUNKS_LOADED - Nombre max de chunks\n  anim_speed - Vitesse d'animation\n\nUsage: var [nom_variable] [valeur]\nExemple: var SPD 10"
+            return "Variables modifiables:\n  SCREEN_W - Largeur de l'écran\n  SCREEN_H - Hauteur de l'écran\n  TS - Taille des tuiles\n  DISPLAY_SCALE - Facteur d'échelle (2x, 3x, etc.)\n  CHUNK_SIZE - Taille des chunks\n  PS - Taille du joueur\n  SPD - Vitesse de déplacement\n  BORDER_SIZE - Taille de la bordure\n  MAX_CHUNKS_LOADED - Nombre max de chunks\n  RENDER_THREADS - Threads de rendu du sol (0 = désactivé)\n  anim_speed - Vitesse d'animation\n\nUsage: var [nom_variable] [valeur]\nExemple: var SPD 10"
         elif len(parts) >= 2 and parts[1].lower() == "list":
             # Afficher la liste des variables avec leurs valeurs
             return get_variables_list(anim_speed_ref)
@@ -711,8 +2281,21 @@ def execute_command(command, console_history, anim_speed_ref=None):
             return set_game_variable(var_name, value, anim_speed_ref)
         else:
             return "Usage: var [nom_variable] [valeur]\nTapez 'var -h' pour voir la liste des variables\nTapez 'var list' pour voir les valeurs actuelles"
+    elif cmd == "export":
+        usage = "Usage: export [cx] [cy] [largeur] [hauteur] [fichier] [pixels_par_tuile]\nExemple: export -10 -10 20 20 carte.png 4"
+        if len(parts) < 5:
+            return usage
+        try:
+            cx0, cy0, width, height = (int(value) for value in parts[1:5])
+            tile_px = int(parts[6]) if len(parts) >= 7 else TS
+        except ValueError:
+            return usage
+        if width <= 0 or height <= 0 or tile_px <= 0:
+            return "Erreur: la largeur, la hauteur et les pixels par tuile doivent être positifs"
+        out_path = parts[5] if len(parts) >= 6 else "carte.png"
+        return start_map_export(cx0, cy0, width, height, out_path, tile_px)
     elif cmd == "help":
-        return "Commandes disponibles:\n  var [nom] [valeur] - Modifie une variable\n  help - Affiche cette aide\n  clear - Efface l'historique"
+        return "Commandes disponibles:\n  var [nom] [valeur] - Modifie une variable\n  export [cx] [cy] [largeur] [hauteur] [fichier] [px] - Exporte une région en PNG\n  help - Affiche cette aide\n  clear - Efface l'historique"
     elif cmd == "clear":
         console_history.clear()
         return "Historique effacé"
@@ -758,14 +2341,25 @@ def draw_console(console_text, console_history):
     prompt = font.render(prompt_text, True, COLORS['WH'])
     screen.blit(prompt, (10, SCREEN_H - 30))
 
-def game_engine():
+def game_engine(use_world_service=False, backend='surface', edits_path=None, render_threads=0):
     """
     Boucle principale du jeu. Gère les états (menu, jeu, pause), les entrées,
     l'animation et le rendu.
+    use_world_service active la génération des chunks dans un processus séparé.
+    backend choisit le rendu (voir RENDER_BACKENDS).
+    edits_path est le journal des modifications du monde (None = non sauvegardées).
+    render_threads active le rendu du sol par bandes dans autant de threads (voir draw_ground).
     """
-    global screen, fullscreen, SCREEN_W, SCREEN_H, HALF_W, HALF_H
+    global fullscreen, SCREEN_W, SCREEN_H, HALF_W, HALF_H, RENDER_THREADS
+    RENDER_THREADS = render_threads
+    init_display(backend)
+    if edits_path is not None:
+        open_edit_log(edits_path)
+    if use_world_service:
+        start_world_service()
+        atexit.register(stop_world_service)
     load_grass_tiles()
-    load_tree_tiles()
+    load_tree_sprites()
     game_state = GAME_STATE_MENU
     world_x = 0  # Position X du joueur dans le monde
     world_y = 0  # Position Y du joueur dans le monde
@@ -778,8 +2372,9 @@ def game_engine():
     console_text = ""
     console_history = []
     previous_state = GAME_STATE_PLAYING  # État avant d'ouvrir la console
+    player_path = []  # Chemin suivi après un clic (tuiles monde)
     draw_menu()
-    pygame.display.flip()
+    present(overlay=True)
     
     while running:
         
@@ -791,10 +2386,7 @@ def game_engine():
                 # Basculer en plein écran
                 if event.key == pygame.K_F11:
                     fullscreen = not fullscreen
-                    if fullscreen:
-                        screen = pygame.display.set_mode((DESKTOP_W, DESKTOP_H), pygame.FULLSCREEN)
-                    else:
-                        screen = pygame.display.set_mode((DESKTOP_W, DESKTOP_H), pygame.RESIZABLE)
+                    resize_display(DESKTOP_W, DESKTOP_H, fullscreen)
                     SCREEN_W = DESKTOP_W
                     SCREEN_H = DESKTOP_H
                     HALF_W = SCREEN_W // 2
@@ -853,6 +2445,23 @@ def game_engine():
             elif event.type == pygame.TEXTINPUT and game_state == GAME_STATE_CONSOLE:
                 console_text += event.text
                 needs_redraw = True
+            # Clic gauche : déplacement jusqu'à la tuile visée
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and game_state == GAME_STATE_PLAYING:
+                mx, my = event.pos
+                goal = ((world_x + (mx - HALF_W) // DISPLAY_SCALE) // TS, (world_y + (my - HALF_H) // DISPLAY_SCALE) // TS)
+                path = find_path((world_x // TS, world_y // TS), goal)
+                player_path = list(path) if path is not None else []
+            # Clic droit : coupe un arbre, ou trace/efface un chemin
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3 and game_state == GAME_STATE_PLAYING:
+                mx, my = event.pos
+                twx = world_x + (mx - HALF_W) // DISPLAY_SCALE
+                twy = world_y + (my - HALF_H) // DISPLAY_SCALE
+                tile = get_tile_at_world(twx, twy)
+                if tile == T_TREE or tile == T_PATH:
+                    edit_tile_at_world(twx, twy, T_GRASS)
+                elif tile == T_GRASS:
+                    edit_tile_at_world(twx, twy, T_PATH)
+                needs_redraw = True
             # Gestion du redimensionnement de la fenêtre
             elif event.type == pygame.VIDEORESIZE:
                 if not fullscreen:
@@ -860,29 +2469,27 @@ def game_engine():
                     SCREEN_H = event.h
                     HALF_W = SCREEN_W // 2
                     HALF_H = SCREEN_H // 2
-                    screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.RESIZABLE)
+                    resize_display(SCREEN_W, SCREEN_H)
                     needs_redraw = True
         
         # Gestion des différents états du jeu
         if game_state == GAME_STATE_MENU:
             if needs_redraw:
                 draw_menu()
-                pygame.display.flip()
+                present(overlay=True)
                 needs_redraw = False
         elif game_state == GAME_STATE_PAUSED:
             if needs_redraw:
-                draw_world(world_x, world_y)
-                draw_player(anim_frame)
+                draw_scene(world_x, world_y, anim_frame)
                 draw_pause_menu()
-                pygame.display.flip()
+                present(overlay=True)
                 needs_redraw = False
         elif game_state == GAME_STATE_CONSOLE:
             # Afficher la console
             if needs_redraw:
-                draw_world(world_x, world_y)
-                draw_player(anim_frame)
+                draw_scene(world_x, world_y, anim_frame)
                 draw_console(console_text, console_history)
-                pygame.display.flip()
+                present(overlay=True)
                 needs_redraw = False
         elif game_state == GAME_STATE_PLAYING:
             # Gestion des entrées et du déplacement
@@ -890,30 +2497,136 @@ def game_engine():
             nwx, nwy, moved = handle_input(world_x, world_y, keys)
             
             if moved:
+                # Le clavier reprend la main sur un déplacement par clic
+                player_path = []
+            elif player_path:
+                nwx, nwy = follow_path(world_x, world_y, player_path)
+            if (nwx, nwy) != (world_x, world_y):
                 world_x, world_y = nwx, nwy
                 needs_redraw = True
             
             # Animation du joueur
             current_anim_time = time.time()
-            if current_anim_time - anim_timer >= anim_speed:
+            anim_tick = current_anim_time - anim_timer >= anim_speed
+            if anim_tick:
                 anim_frame = (anim_frame + 1) % 20
                 anim_timer = current_anim_time
                 needs_redraw = True
             
+            # Slimes errants des chunks chargés : on ne redessine que si l'un d'eux a
+            # bougé ou changé d'image dans la vue
+            update_entities(anim_tick)
+            if update_visible_entities(world_x, world_y):
+                needs_redraw = True
+            
             # Rendu
             if needs_redraw:
-                draw_world(world_x, world_y)
-                draw_player(anim_frame)
+                draw_scene(world_x, world_y, anim_frame)
                 # Récupère les FPS directement depuis clock
                 fps = int(clock.get_fps())
                 draw_fps(fps)
-                pygame.display.flip()
+                present()
                 needs_redraw = False
         
         clock.tick(50)  # Limite à 50 FPS
     
+    stop_world_service()
+    shutdown_render_pool()
+    wait_map_export()
+    close_edit_log()
+    pygame.quit()
+
+def run_render_bench(thread_counts, frames):
+    """
+    Mesure le temps de rendu du sol (draw_ground, seule partie dessinée par bandes) en
+    1080p et en 4K, dans le thread principal puis avec chaque nombre de threads de
+    thread_counts, et affiche l'accélération obtenue. Les chunks sont chargés avant la
+    mesure. Le rendu se fait hors écran : aucune fenêtre n'est ouverte.
+    """
+    global screen, SCREEN_W, SCREEN_H, HALF_W, HALF_H, RENDER_THREADS
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    load_grass_tiles()
+    load_tree_sprites()
+    print(f"{os.cpu_count()} coeurs disponibles")
+    for name, size in (("1080p", (1920, 1080)), ("4K", (3840, 2160))):
+        SCREEN_W, SCREEN_H = size
+        HALF_W, HALF_H = SCREEN_W // 2, SCREEN_H // 2
+        screen = pygame.Surface(size, 0, pygame.display.get_surface())
+        print(f"Rendu {name} ({SCREEN_W}x{SCREEN_H}), {frames} images :")
+        baseline = None
+        for threads in [0] + [n for n in thread_counts if n > 0]:
+            RENDER_THREADS = threads
+            # Chargement des chunks et création des threads hors mesure
+            draw_world(0, 0)
+            draw_ground(0, 0)
+            start_time = time.perf_counter()
+            for _ in range(frames):
+                draw_ground(0, 0)
+            frame_ms = (time.perf_counter() - start_time) * 1000 / frames
+            if baseline is None:
+                baseline = frame_ms
+            label = f"{threads} threads" if threads else "sans thread"
+            print(f"  {label:>12} : {frame_ms:7.2f} ms/image  x{baseline / frame_ms:.2f}")
+    shutdown_render_pool()
     pygame.quit()
+    return 0
+
+def main(argv=None):
+    """
+    Point d'entrée en ligne de commande.
+    Sans sous-commande, lance le jeu ; "pregen" prégénère le monde sans fenêtre,
+    "bench" mesure le rendu multithread, "export" exporte une région en PNG.
+    """
+    parser = argparse.ArgumentParser(description="A.T.O - Jeu d'exploration avec génération procédurale de monde")
+    parser.add_argument("--world-service", action="store_true",
+                        help="génère les chunks dans un processus séparé (transfert par mémoire partagée)")
+    parser.add_argument("--backend", choices=RENDER_BACKENDS, default='surface',
+                        help="moteur de rendu : surface (par défaut), sdl2 (textures), sdl2-software (textures, rendu logiciel)")
+    parser.add_argument("--edits", metavar="FICHIER",
+                        help="journal où sauvegarder les modifications du monde (par défaut : non sauvegardées)")
+    parser.add_argument("--render-threads", type=int, default=0, metavar="N",
+                        help="dessine le sol par bandes dans N threads (backend surface, 0 = désactivé)")
+    parser.add_argument("--world", metavar="FICHIER",
+                        help="utilise un monde prégénéré par la commande pregen")
+    commands = parser.add_subparsers(dest="command")
+    pregen_parser = commands.add_parser("pregen", help="prégénère les chunks autour de l'origine, sans fenêtre")
+    pregen_parser.add_argument("--radius", type=int, required=True, help="rayon en chunks autour de l'origine")
+    pregen_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="nombre de processus")
+    pregen_parser.add_argument("--out", required=True, help="fichier de sortie (repris s'il existe)")
+    bench_parser = commands.add_parser("bench", help="mesure le rendu par bandes en 1080p et 4K, sans fenêtre")
+    bench_parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="nombres de threads à mesurer")
+    bench_parser.add_argument("--frames", type=int, default=60, help="images rendues par mesure")
+    export_parser = commands.add_parser("export", help="exporte une région du monde en PNG, sans fenêtre")
+    export_parser.add_argument("--region", type=int, nargs=4, required=True, metavar=("CX", "CY", "LARGEUR", "HAUTEUR"),
+                               help="chunk du coin haut gauche et taille de la région, en chunks")
+    export_parser.add_argument("--tile-px", type=int, default=TS, help=f"pixels par tuile dans l'image (par défaut : {TS})")
+    export_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                               help="processus de rendu des bandes (0 = dans ce processus)")
+    export_parser.add_argument("--out", required=True, help="image PNG de sortie")
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        cx0, cy0, width, height = args.region
+        if width <= 0 or height <= 0 or args.tile_px <= 0:
+            print("Erreur: la largeur, la hauteur et les pixels par tuile doivent être positifs")
+            return 1
+        if args.edits is not None and load_edit_log(args.edits) is None:
+            return 1
+        return export_map(cx0, cy0, width, height, args.out, args.tile_px, max(0, args.workers))
+    if args.command == "pregen":
+        if args.radius < 0 or args.workers < 1:
+            print("Erreur: le rayon doit être positif ou nul et il faut au moins un processus")
+            return 1
+        return run_pregen(args.radius, args.workers, args.out)
+    if args.command == "bench":
+        return run_render_bench(args.threads, args.frames)
+    if args.world is not None and not open_pregen_world(args.world):
+        return 1
+    game_engine(use_world_service=args.world_service, backend=args.backend, edits_path=args.edits,
+                render_threads=max(0, args.render_threads))
+    return 0
 
 if __name__ == "__main__":
-    game_engine()
+    sys.exit(main())
 
@@ -6,14 +6,14 @@ if errorlevel 1 (
     exit /b 1
 )
 
-python -c "import pygame" >nul 2>&1
+python -c "import pygame, numpy" >nul 2>&1
 if errorlevel 1 (
     echo Installation des dependances...
-    python -m pip install pygame>=2.5.0
+    python -m pip install "pygame>=2.5.0" numpy
     if errorlevel 1 (
-        echo Erreur lors de l'installation de pygame.
+        echo Erreur lors de l'installation des dependances.
         echo Essayez d'installer manuellement :
-        echo   pip install pygame
+        echo   pip install pygame numpy
         pause
         exit /b 1
     )
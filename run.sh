@@ -5,9 +5,9 @@ if ! command -v python3 &> /dev/null; then
     exit 1
 fi
 
-if ! python3 -c "import pygame" 2>/dev/null; then
+if ! python3 -c "import pygame, numpy" 2>/dev/null; then
     echo "Installation des dépendances..."
-    if ! python3 -m pip install --user pygame>=2.5.0 2>&1 | tee /tmp/pygame_install.log; then
+    if ! python3 -m pip install --user "pygame>=2.5.0" numpy 2>&1 | tee /tmp/pygame_install.log; then
         echo ""
         echo "Erreur lors de l'installation automatique."
         echo ""
@@ -0,0 +1,54 @@
+"""
+Comparaison pixel à pixel des backends de rendu : le monde dessiné par le Renderer
+SDL2 (rendu logiciel) doit être identique à celui du backend surface.
+"""
+
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ato  # noqa: E402
+import pygame  # noqa: E402
+
+SIZE = (1024, 768)
+
+
+def render_scene(backend):
+    """
+    Dessine draw_scene(300, 200, 5) avec le backend donné et retourne l'image en RGB.
+    """
+    ato.init_display(backend)
+    if ato.sdl_window is not None:
+        ato.sdl_window.size = SIZE
+    ato.resize_display(*SIZE)
+    ato.SCREEN_W, ato.SCREEN_H = SIZE
+    ato.HALF_W, ato.HALF_H = SIZE[0] // 2, SIZE[1] // 2
+    ato.load_grass_tiles()
+    ato.load_tree_sprites()
+    ato.invalidate_anim_cache()
+    ato.draw_scene(300, 200, 5)
+    if ato.renderer is None:
+        image = ato.screen.copy()
+    else:
+        image = ato.renderer.to_surface()
+    return pygame.image.tobytes(image, 'RGB')
+
+
+@pytest.mark.skipif(ato.Renderer is None, reason="pygame._sdl2 indisponible")
+def test_sdl2_software_matches_surface():
+    try:
+        expected = render_scene('surface')
+        ato.renderer = ato.sdl_window = None
+        pygame.quit()
+        actual = render_scene('sdl2-software')
+    finally:
+        ato.renderer = ato.sdl_window = None
+        ato.texture_cache.clear()
+        pygame.quit()
+    assert len(actual) == len(expected)
+    differing = sum(1 for i in range(0, len(expected), 3) if expected[i:i + 3] != actual[i:i + 3])
+    assert differing == 0